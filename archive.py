@@ -0,0 +1,234 @@
+"""Compressed, partitioned long-term archive of scraped articles.
+
+Each run writes scraped_data/archive/<YYYY-MM-DD>/<prefix>_<timestamp>.artarc.
+Inside, the articles of each source are stored as JSONL blocks of up to
+ARCHIVE_BLOCK_RECORDS records, each block compressed on its own (gzip or
+zstd). A JSON footer after the last block lists, per source, the byte
+offset, compressed length, first record number and record count of every
+block; the file ends with the footer length and a magic string. A reader
+can therefore stream or filter one source, or fetch a single record,
+without decompressing the blocks of the others.
+
+Because of the footer the file is not a plain gzip/zstd stream (zcat
+would report trailing garbage); only ArchiveReader (or this CLI) reads it.
+
+Usage:
+    python archive.py --list [--date 2026-10-18]
+    python archive.py --source "CBC News Canada" [--date ...] [FILE ...]
+    python archive.py --source "CBC News Canada" --record 12 FILE
+"""
+import argparse
+import bisect
+import glob
+import gzip
+import json
+import os
+import struct
+import sys
+from datetime import datetime
+
+# Write an archive of every run next to the other exports; set to 0 to disable
+ARCHIVE_OUTPUT = os.environ.get("SCRAPER_ARCHIVE", "1") != "0"
+
+ARCHIVE_DIR = os.environ.get("SCRAPER_ARCHIVE_DIR", os.path.join("scraped_data", "archive"))
+
+# "gzip" (standard library) or "zstd" (needs the zstandard package; falls
+# back to gzip when it isn't installed)
+ARCHIVE_CODEC = os.environ.get("SCRAPER_ARCHIVE_CODEC", "gzip")
+ARCHIVE_LEVEL = int(os.environ.get("SCRAPER_ARCHIVE_LEVEL", "0"))
+
+# Records per compressed block: bigger blocks compress better, smaller ones
+# make single-record lookups cheaper
+ARCHIVE_BLOCK_RECORDS = int(os.environ.get("SCRAPER_ARCHIVE_BLOCK_RECORDS", "256"))
+
+CODECS = ("gzip", "zstd")
+ARCHIVE_EXTENSION = ".artarc"
+DEFAULT_LEVELS = {"gzip": 9, "zstd": 19}
+
+MAGIC = b"ARTARC01"
+_TRAILER = struct.Struct("<Q8s")
+
+
+def resolve_codec(codec=None):
+    """Codec to write with: the requested one if available, else gzip"""
+    codec = codec or ARCHIVE_CODEC
+    if codec not in CODECS:
+        raise ValueError(f"Unknown archive codec: {codec}")
+    if codec == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("zstandard is not installed; archiving with gzip")
+            return "gzip"
+    return codec
+
+
+def _compressor(codec, level):
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=level).compress
+    return lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _decompressor(codec):
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress
+    return gzip.decompress
+
+
+def archive_path(prefix, timestamp, directory=ARCHIVE_DIR):
+    """Path of a run's archive, partitioned by the run's date"""
+    try:
+        day = datetime.strptime(timestamp, "%Y%m%d_%H%M%S").strftime("%Y-%m-%d")
+    except ValueError:
+        day = datetime.now().strftime("%Y-%m-%d")
+    return os.path.join(directory, day, f"{prefix}_{timestamp}{ARCHIVE_EXTENSION}")
+
+
+class ArchiveWriter:
+    """Writes articles into per-source compressed blocks, then the footer index
+
+    Articles may arrive in any source order; each source keeps at most one
+    pending block in memory.
+    """
+
+    def __init__(self, path, codec=None, level=None, block_records=ARCHIVE_BLOCK_RECORDS):
+        self.path = path
+        self.codec = resolve_codec(codec)
+        self.compress = _compressor(self.codec, level or ARCHIVE_LEVEL or DEFAULT_LEVELS[self.codec])
+        self.block_records = block_records
+        self.pending = {}
+        self.sources = {}
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.file = open(self.tmp_path, "wb")
+
+    def write(self, encoded, source):
+        """Add one article, already serialized as JSON bytes (see exporter.encode_article)"""
+        source = source or ""
+        block = self.pending.setdefault(source, [])
+        block.append(encoded)
+        self.count += 1
+        if len(block) >= self.block_records:
+            self._flush(source)
+
+    def _flush(self, source):
+        block = self.pending.pop(source, None)
+        if not block:
+            return
+        entry = self.sources.setdefault(source, {"records": 0, "blocks": []})
+        data = self.compress(b"\n".join(block) + b"\n")
+        entry["blocks"].append([self.file.tell(), len(data), entry["records"], len(block)])
+        entry["records"] += len(block)
+        self.file.write(data)
+
+    def close(self):
+        """Flush the pending blocks, write the footer and move the archive into place"""
+        for source in list(self.pending):
+            self._flush(source)
+        footer = json.dumps({
+            "version": 1,
+            "codec": self.codec,
+            "records": self.count,
+            "sources": self.sources,
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.file.write(footer)
+        self.file.write(_TRAILER.pack(len(footer), MAGIC))
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+
+class ArchiveReader:
+    """Reads an archive through its footer index, decompressing only the blocks asked for"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.file.seek(-_TRAILER.size, os.SEEK_END)
+        footer_size, magic = _TRAILER.unpack(self.file.read(_TRAILER.size))
+        if magic != MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} is not an article archive")
+        self.file.seek(-_TRAILER.size - footer_size, os.SEEK_END)
+        self.footer = json.loads(self.file.read(footer_size))
+        self.decompress = _decompressor(self.footer["codec"])
+
+    def __len__(self):
+        return self.footer["records"]
+
+    def sources(self):
+        """(source, record count) in the order the sources were first written"""
+        return [(source, entry["records"]) for source, entry in self.footer["sources"].items()]
+
+    def _block(self, offset, length):
+        self.file.seek(offset)
+        return self.decompress(self.file.read(length)).splitlines()
+
+    def records(self, source=None):
+        """Yield the articles of one source, or of every source in file order"""
+        if source is None:
+            blocks = sorted(b for entry in self.footer["sources"].values() for b in entry["blocks"])
+        else:
+            entry = self.footer["sources"].get(source)
+            blocks = entry["blocks"] if entry else []
+        for offset, length, _, _ in blocks:
+            for line in self._block(offset, length):
+                yield json.loads(line)
+
+    def record(self, source, number):
+        """Article number (0-based) of a source, decompressing a single block"""
+        blocks = self.footer["sources"][source]["blocks"]
+        if not 0 <= number < self.footer["sources"][source]["records"]:
+            raise IndexError(f"{source} has {self.footer['sources'][source]['records']} records")
+        offset, length, first, _ = blocks[bisect.bisect_right([b[2] for b in blocks], number) - 1]
+        return json.loads(self._block(offset, length)[number - first])
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def archive_files(date=None, directory=ARCHIVE_DIR):
+    """Archives of one day's runs (YYYY-MM-DD), or of every day, oldest first"""
+    return sorted(glob.glob(os.path.join(directory, date or "*", f"*{ARCHIVE_EXTENSION}")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="archives to read (default: every archive of --date)")
+    parser.add_argument("--date", help="only the runs of this day (YYYY-MM-DD)")
+    parser.add_argument("--source", help="only the articles of this source")
+    parser.add_argument("--record", type=int, help="print record N (0-based) of --source")
+    parser.add_argument("--list", action="store_true", help="list the sources and record counts of each archive")
+    args = parser.parse_args()
+
+    files = args.files or archive_files(args.date)
+    if not files:
+        sys.exit(f"No archives found in {ARCHIVE_DIR}")
+    if args.record is not None and (not args.source or len(files) != 1):
+        sys.exit("--record needs --source and a single archive")
+
+    out = sys.stdout
+    for path in files:
+        with ArchiveReader(path) as reader:
+            if args.list:
+                print(f"{path}: {len(reader)} records, {os.path.getsize(path)} bytes")
+                for source, count in reader.sources():
+                    print(f"{count:6d}  {source}")
+            elif args.record is not None:
+                out.write(json.dumps(reader.record(args.source, args.record), ensure_ascii=False) + "\n")
+            else:
+                for article in reader.records(args.source):
+                    out.write(json.dumps(article, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""SQLite store of every scraped article, with a full-text index over title and content.
+
+Enabled with SCRAPER_ARTICLE_STORE=1: the scrapers upsert each article,
+keyed by its canonical URL, as soon as it is extracted. Past scrapes can
+then be queried without re-reading the JSON exports.
+
+Usage:
+    python article_store.py --source "Radio-Canada Estrie" --match "hôpital" --month 2026-10
+    python article_store.py --match "pont OR traversier" --since 2026-10-01 --limit 50
+    python article_store.py --import scraped_data/*.jsonl
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from url_canonical import canonical_url
+
+# Upsert every scraped article into the store; set to 1 to enable
+ARTICLE_STORE_ENABLED = os.environ.get("SCRAPER_ARTICLE_STORE", "0") == "1"
+
+ARTICLE_STORE_PATH = os.environ.get("SCRAPER_ARTICLE_STORE_PATH", "scraped_data/articles.sqlite3")
+
+# Articles written per transaction
+STORE_BATCH_SIZE = int(os.environ.get("SCRAPER_ARTICLE_STORE_BATCH", "100"))
+
+_COLUMNS = ("url", "source", "title", "content", "date_scraped", "published", "byline")
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS articles ("
+    "id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, source TEXT, title TEXT, content TEXT, "
+    "date_scraped TEXT, published TEXT, byline TEXT, record TEXT)",
+    "CREATE INDEX IF NOT EXISTS articles_source_date ON articles (source, date_scraped)",
+    "CREATE INDEX IF NOT EXISTS articles_date ON articles (date_scraped)",
+]
+
+# External-content FTS5 table kept in step with articles by triggers
+_FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+    "title, content, content='articles', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN "
+    "INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN "
+    "INSERT INTO articles_fts (articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, content ON articles BEGIN "
+    "INSERT INTO articles_fts (articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+_UPSERT = (
+    f"INSERT INTO articles ({', '.join(_COLUMNS)}, record) VALUES ({', '.join('?' * (len(_COLUMNS) + 1))}) "
+    "ON CONFLICT (url) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS[1:] + ("record",))
+)
+
+
+class ArticleStore:
+    """SQLite table of articles keyed by canonical URL, written in batched transactions
+
+    The database runs in WAL mode, so queries can read it while a scrape
+    is writing. Articles are buffered and upserted STORE_BATCH_SIZE at a
+    time; the FTS5 index is maintained by triggers in the same transaction.
+    """
+
+    def __init__(self, path=ARTICLE_STORE_PATH, batch_size=STORE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending = []
+        self.written = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            for statement in _SCHEMA:
+                self.db.execute(statement)
+            try:
+                for statement in _FTS_SCHEMA:
+                    self.db.execute(statement)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: queries fall back to LIKE
+                self.fts = False
+
+    def add(self, article):
+        """Queue an article for upsert, writing the batch once it is full"""
+        row = tuple(article.get(column) for column in _COLUMNS[1:])
+        row = (canonical_url(article['url']),) + row + (json.dumps(article, ensure_ascii=False),)
+        with self.lock:
+            self.pending.append(row)
+            if len(self.pending) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        with self.db:
+            self.db.executemany(_UPSERT, self.pending)
+        self.written += len(self.pending)
+        self.pending = []
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def query(self, match=None, source=None, since=None, until=None, limit=20):
+        """Newest articles matching an FTS5 query, a source and a date_scraped range
+
+        source is an exact source name, so the (source, date_scraped) index
+        serves the filter. since and until are dates or datetimes
+        (YYYY-MM-DD[ HH:MM:SS]); until is exclusive.
+        """
+        where = []
+        params = []
+        if match and self.fts:
+            sql = ("SELECT a.date_scraped, a.source, a.title, a.url, "
+                   "snippet(articles_fts, 1, '[', ']', '…', 12) "
+                   "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid")
+            where.append("articles_fts MATCH ?")
+            params.append(match)
+        else:
+            sql = "SELECT a.date_scraped, a.source, a.title, a.url, substr(a.content, 1, 120) FROM articles a"
+            if match:
+                where.append("(a.title LIKE ? OR a.content LIKE ?)")
+                params.extend([f"%{match}%"] * 2)
+        if source:
+            where.append("a.source = ?")
+            params.append(source)
+        if since:
+            where.append("a.date_scraped >= ?")
+            params.append(since)
+        if until:
+            where.append("a.date_scraped < ?")
+            params.append(until)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY a.date_scraped DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def close(self):
+        """Write the last batch and close the database"""
+        with self.lock:
+            self._flush()
+            self.db.close()
+        print(f"Article store: {self.written} articles upserted into {self.path}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_article_store():
+    """Return the process-wide article store, or None when the store is disabled"""
+    global _store
+    if not ARTICLE_STORE_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ArticleStore()
+        return _store
+
+
+def close_article_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+
+def _import_file(store, path):
+    from article_stream import read_article_file
+
+    count = 0
+    for article in read_article_file(path):
+        if article.get('url'):
+            store.add(article)
+            count += 1
+    return count
+
+
+def _month_range(month):
+    start = datetime.strptime(month, "%Y-%m")
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=ARTICLE_STORE_PATH)
+    parser.add_argument("--match", help="FTS5 query over title and content (e.g. 'pont', '\"centre-ville\"', 'a OR b')")
+    parser.add_argument("--source", help="only articles of this source (its exact name, e.g. 'CBC Montreal')")
+    parser.add_argument("--month", help="only articles scraped in this month (YYYY-MM, or 'this')")
+    parser.add_argument("--since", help="only articles scraped on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="only articles scraped before this date (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--import", dest="import_files", nargs="+", metavar="FILE",
+                        help="upsert the articles of JSONL streams or JSON exports")
+    args = parser.parse_args()
+
+    store = ArticleStore(args.db)
+    if args.import_files:
+        total = sum(_import_file(store, path) for path in args.import_files)
+        store.close()
+        print(f"Imported {total} articles from {len(args.import_files)} files")
+        return
+
+    since, until = args.since, args.until
+    if args.month:
+        month = datetime.now().strftime("%Y-%m") if args.month == "this" else args.month
+        since, until = _month_range(month)
+
+    start = time.perf_counter()
+    try:
+        rows = store.query(args.match, args.source, since, until, args.limit)
+    except sqlite3.OperationalError as e:
+        sys.exit(f"Query failed: {e}")
+    elapsed = (time.perf_counter() - start) * 1000
+    for date_scraped, source, title, url, excerpt in rows:
+        print(f"{date_scraped}  {source}  {title}\n    {url}\n    {excerpt}")
+    print(f"{len(rows)} articles in {elapsed:.1f} ms")
+    store.db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+
+from run_manifest import record_run
+from seen_index import get_seen_index
+
+# Append every article to scraped_data/<prefix>_<timestamp>.jsonl as soon as
+# it is extracted instead of holding the whole run in memory; set to 0 to
+# collect per-site lists as before
+STREAM_OUTPUT = os.environ.get("SCRAPER_STREAM_OUTPUT", "1") != "0"
+
+STREAM_DIR = "scraped_data"
+
+
+class ArticleStream:
+    """Append-only JSONL file that receives articles while the scrape is running
+
+    Each article is written as one line and flushed immediately, so a crash
+    loses at most the article being written. Only URLs are kept in memory
+    (for de-duplication across sites), never article content.
+    """
+
+    def __init__(self, path, seen_urls=None):
+        self.path = path
+        self.seen_urls = seen_urls if seen_urls is not None else set()
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, article):
+        """Append an article unless its URL was already written in this run"""
+        line = json.dumps(article, ensure_ascii=False) + "\n"
+        with self.lock:
+            if article['url'] in self.seen_urls:
+                return False
+            self.seen_urls.add(article['url'])
+            self.file.write(line)
+            self.file.flush()
+            self.counts[article['source']] = self.counts.get(article['source'], 0) + 1
+        get_seen_index().add_article(article)
+        return True
+
+    @property
+    def count(self):
+        with self.lock:
+            return sum(self.counts.values())
+
+    def report(self, sites):
+        """Print the per-site counts and return how many sites produced articles"""
+        successful_sites = 0
+        for site in sites:
+            count = self.counts.get(site['name'], 0)
+            print(f"Scraped {count} unique articles from {site['name']}")
+            if count:
+                successful_sites += 1
+        return successful_sites
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+def read_articles(path):
+    """Yield the articles of a JSONL file one at a time
+
+    A truncated last line (the run was killed mid-write) is skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Skipping malformed line {line_number} of {path}")
+
+
+def read_json_array(path, chunk_size=1 << 16):
+    """Yield the records of a JSON array file (an export) one at a time
+
+    The file is decoded incrementally, so only the record being read is
+    held in memory rather than the whole array.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip(" \t\r\n,")
+            if buffer.startswith("]"):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except ValueError:
+                # The record continues past the buffer: read as much again
+                more = f.read(max(chunk_size, len(buffer)))
+                if not more:
+                    raise
+                buffer += more
+                continue
+            yield record
+            buffer = buffer[end:]
+
+
+def read_article_file(path):
+    """Yield the articles of a JSONL stream or of a JSON export, one at a time"""
+    if path.endswith(".jsonl"):
+        yield from read_articles(path)
+        return
+    try:
+        yield from read_json_array(path)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read {path}: {e}")
+
+
+class ArticleFile:
+    """The articles of a JSONL file as an iterable that re-reads the file on each pass"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        return read_articles(self.path)
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def open_article_stream(prefix, timestamp, seen_urls=None):
+    """Start the stream for one output prefix (e.g. "news_articles") of this run"""
+    os.makedirs(STREAM_DIR, exist_ok=True)
+    stream = ArticleStream(os.path.join(STREAM_DIR, f"{prefix}_{timestamp}.jsonl"), seen_urls)
+    with _streams_lock:
+        _streams[prefix] = stream
+    # The run becomes the prefix's latest with its stream as the only output,
+    # so a run that dies before exporting is still found by combine_outputs.py;
+    # record_run replaces the entry with every output once the run finishes
+    record_run(timestamp, prefix, [], stream)
+    return stream
+
+
+def get_article_stream(prefix):
+    """Return the open stream for a prefix, or None when articles are collected in memory"""
+    with _streams_lock:
+        return _streams.get(prefix)
+
+
+def close_article_stream(prefix):
+    with _streams_lock:
+        stream = _streams.pop(prefix, None)
+    if stream is not None:
+        stream.close()
+    return stream
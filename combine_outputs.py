@@ -1,23 +1,55 @@
 import os
 import glob
 import json
+import argparse
+import hashlib
+import heapq
+import re
+import tempfile
 from datetime import datetime
 
+from article_stream import read_article_file
+from combined_reader import index_path
+from run_manifest import latest_run, list_runs, load_run, output_files
 
-def latest_file(pattern: str):
-    files = glob.glob(pattern)
+PREFIXES = ("news_articles", "radio_canada_articles")
+
+# Memory used to sort one run of records before it is spilled to a temporary file
+SORT_BUFFER_BYTES = int(os.environ.get("COMBINE_SORT_BUFFER_BYTES", str(64 * 1024 * 1024)))
+
+# Full outputs of runs from before manifests existed: <prefix>_<YYYYmmdd_HHMMSS>.json[l]
+RUN_FILE_RE = re.compile(r"^(?P<prefix>%s)_(?P<run_id>\d{8}_\d{6})\.jsonl?$" % "|".join(PREFIXES))
+
+
+def latest_file(pattern: str, exclude: str = None):
+    files = [f for f in glob.glob(pattern) if not (exclude and exclude in os.path.basename(f))]
     if not files:
         return None
     return max(files, key=os.path.getmtime)
 
 
-def load_json(path: str):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Failed to read {path}: {e}")
-        return []
+def latest_articles_file(prefix: str):
+    """Full output of a scraper's latest run, preferring its JSON export to the JSONL stream
+
+    The export is the one with near-duplicate stories collapsed; the raw
+    stream is only used when a run was interrupted before exporting.
+
+    Inputs are looked up in the run manifest; globbing scraped_data is
+    only a fallback for outputs written before manifests existed.
+    """
+    manifest = latest_run(prefix)
+    if manifest is not None:
+        for kind in ("full", "stream"):
+            for path in output_files(manifest, prefix, kind):
+                if os.path.exists(path):
+                    return path
+        print(f"Files listed in the {prefix} run manifest are missing; searching scraped_data")
+
+    newest = latest_file(f"scraped_data/{prefix}_*.json*", exclude="_summary_")
+    if not newest:
+        return None
+    export = os.path.splitext(newest)[0] + ".json"
+    return export if os.path.exists(export) else newest
 
 
 def ensure_str(value):
@@ -28,65 +60,198 @@ def ensure_str(value):
     return str(value)
 
 
-def main():
-    os.makedirs("output", exist_ok=True)
+def run_inputs(manifest, prefix: str):
+    for kind in ("full", "stream"):
+        for path in output_files(manifest, prefix, kind):
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def discover_runs():
+    """Map every run id to its {prefix: path} inputs, from manifests and older file names"""
+    runs = {}
+    manifest_runs = set(list_runs())
+    for run_id in sorted(manifest_runs):
+        manifest = load_run(run_id)
+        inputs = {prefix: run_inputs(manifest, prefix) for prefix in PREFIXES}
+        runs[run_id] = {prefix: path for prefix, path in inputs.items() if path}
+    try:
+        names = sorted(os.listdir("scraped_data"))
+    except OSError:
+        names = []
+    for name in names:
+        match = RUN_FILE_RE.match(name)
+        if not match or match.group("run_id") in manifest_runs:
+            continue
+        inputs = runs.setdefault(match.group("run_id"), {})
+        # Sorted names put a run's .json before its .jsonl, so the export wins
+        inputs.setdefault(match.group("prefix"), os.path.join("scraped_data", name))
+    return runs
+
+
+def select_runs(runs: dict, last: int = None, since: str = None, until: str = None):
+    """Run ids within [since, until] (YYYY-MM-DD, inclusive), keeping only the last N, newest first"""
+    selected = sorted(runs)
+    if since:
+        selected = [r for r in selected if r[:8] >= since.replace("-", "")]
+    if until:
+        selected = [r for r in selected if r[:8] <= until.replace("-", "")]
+    if last:
+        selected = selected[-last:]
+    return list(reversed(selected))
+
+
+def _digest(text: str):
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def unique_records(paths, stats: dict):
+    """Records of all input files in order, dropping repeats of a URL or of identical content
 
-    news_json = latest_file("scraped_data/news_articles_*.json")
-    rc_json = latest_file("scraped_data/radio_canada_articles_*.json")
+    Only 20-byte digests are remembered per article; the first file listed
+    (the newest run) wins.
+    """
+    seen_urls = set()
+    seen_content = set()
+    for path in paths:
+        for a in read_article_file(path):
+            url = _digest(ensure_str(a.get("url")).split("#")[0].strip())
+            content = _digest(ensure_str(a.get("content")).strip())
+            if url in seen_urls or (content in seen_content and a.get("content")):
+                stats["duplicates"] += 1
+                continue
+            seen_urls.add(url)
+            seen_content.add(content)
+            yield a
 
-    articles = []
-    source_files = []
 
-    if news_json:
-        data = load_json(news_json)
-        if isinstance(data, list):
-            articles.extend(data)
-            source_files.append(news_json)
-        else:
-            print(f"Unexpected JSON structure in {news_json}; expected a list of records.")
+def spill_sorted_runs(records, directory: str, buffer_bytes: int = SORT_BUFFER_BYTES):
+    """Sort records by (source, title) in memory-sized runs written to temporary files
 
-    if rc_json:
-        data = load_json(rc_json)
-        if isinstance(data, list):
-            articles.extend(data)
-            source_files.append(rc_json)
-        else:
-            print(f"Unexpected JSON structure in {rc_json}; expected a list of records.")
+    Returns the run files and the number of records. The input position is
+    part of the key so equal titles keep their input order.
+    """
+    run_files = []
+    buffer = []
+    buffered = 0
+    count = 0
+
+    def spill():
+        buffer.sort()
+        path = os.path.join(directory, f"run_{len(run_files):05d}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for source, title, seq, line in buffer:
+                f.write(json.dumps([source, title, seq], ensure_ascii=False) + "\t" + line + "\n")
+        run_files.append(path)
+        buffer.clear()
+
+    for a in records:
+        line = json.dumps(a, ensure_ascii=False)
+        buffer.append((ensure_str(a.get("source")), ensure_str(a.get("title")), count, line))
+        buffered += len(line)
+        count += 1
+        if buffered >= buffer_bytes:
+            spill()
+            buffered = 0
+    if buffer:
+        spill()
+    return run_files, count
+
+
+def read_sorted_run(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            key, record = line.rstrip("\n").split("\t", 1)
+            # JSON escapes tabs inside strings, so the first tab ends the key
+            yield tuple(json.loads(key)), record
+
+
+def merged_records(run_files):
+    """k-way merge of the sorted run files; only one record per file is held at a time"""
+    for _, record in heapq.merge(*(read_sorted_run(path) for path in run_files), key=lambda item: item[0]):
+        yield json.loads(record)
+
+
+def article_block(idx: int, a: dict):
+    return (
+        f"Article {idx}\n"
+        f"Source: {ensure_str(a.get('source'))}\n"
+        f"Title: {ensure_str(a.get('title'))}\n"
+        f"URL: {ensure_str(a.get('url'))}\n"
+        f"Date Scraped: {ensure_str(a.get('date_scraped'))}\n"
+        "Content:\n"
+        + ensure_str(a.get("content")).strip() + "\n"
+        + "\n" + "-" * 80 + "\n\n"
+    )
+
+
+def write_combined(out_path: str, records, count: int, source_files):
+    """Write the combined text file and its byte-offset index (see combined_reader.py)"""
+    header = f"Combined articles: {count}\nSource files used:\n"
+    header += "".join(f"- {s}\n" for s in source_files)
+    header += "\n" + "=" * 80 + "\n\n"
+
+    with open(out_path, "wb") as f, open(index_path(out_path), "w", encoding="utf-8") as index:
+        f.write(header.encode("utf-8"))
+        offset = f.tell()
+        for idx, a in enumerate(records, 1):
+            block = article_block(idx, a).encode("utf-8")
+            f.write(block)
+            index.write(json.dumps({
+                "article": idx,
+                "offset": offset,
+                "length": len(block),
+                "source": ensure_str(a.get("source")),
+                "url": ensure_str(a.get("url")),
+                "title": ensure_str(a.get("title")),
+            }, ensure_ascii=False) + "\n")
+            offset += len(block)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine scraped articles into a single text file")
+    parser.add_argument("--runs", type=int, help="combine the last N runs instead of only the latest")
+    parser.add_argument("--since", help="combine runs from this date on (YYYY-MM-DD)")
+    parser.add_argument("--until", help="combine runs up to this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    os.makedirs("output", exist_ok=True)
+
+    if args.runs or args.since or args.until:
+        runs = discover_runs()
+        selected = select_runs(runs, args.runs, args.since, args.until)
+        source_files = [runs[r][prefix] for r in selected for prefix in PREFIXES if prefix in runs[r]]
+        checked = [f"runs {', '.join(selected) or 'none'}"]
+    else:
+        news_json = latest_articles_file("news_articles")
+        rc_json = latest_articles_file("radio_canada_articles")
+        source_files = [path for path in (news_json, rc_json) if path]
+        checked = [news_json or "none", rc_json or "none"]
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     out_path = f"output/combined_news_{timestamp}.txt"
 
-    if not articles:
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write("No articles found to combine.\n")
-            f.write("Checked sources:\n")
-            f.write(f"- {news_json or 'none'}\n")
-            f.write(f"- {rc_json or 'none'}\n")
-        print(f"Wrote empty combined file at {out_path}")
-        return
-
-    # Sort for a consistent order
-    articles.sort(key=lambda a: (ensure_str(a.get("source")), ensure_str(a.get("title"))))
-
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(f"Combined articles: {len(articles)}\n")
-        f.write("Source files used:\n")
-        for s in source_files:
-            f.write(f"- {s}\n")
-        f.write("\n" + "=" * 80 + "\n\n")
-
-        for idx, a in enumerate(articles, 1):
-            f.write(f"Article {idx}\n")
-            f.write(f"Source: {ensure_str(a.get('source'))}\n")
-            f.write(f"Title: {ensure_str(a.get('title'))}\n")
-            f.write(f"URL: {ensure_str(a.get('url'))}\n")
-            f.write(f"Date Scraped: {ensure_str(a.get('date_scraped'))}\n")
-            f.write("Content:\n")
-            f.write(ensure_str(a.get("content")).strip() + "\n")
-            f.write("\n" + "-" * 80 + "\n\n")
-
-    print(f"Wrote combined file at {out_path}")
+    # External sort: sorted runs of at most SORT_BUFFER_BYTES are spilled to
+    # disk and then merged, so memory does not grow with the number of runs
+    stats = {"duplicates": 0}
+    with tempfile.TemporaryDirectory(prefix="combine_") as tmp:
+        run_files, count = spill_sorted_runs(unique_records(source_files, stats), tmp)
+
+        if not count:
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.write("No articles found to combine.\n")
+                f.write("Checked sources:\n")
+                for c in checked:
+                    f.write(f"- {c}\n")
+            print(f"Wrote empty combined file at {out_path}")
+            return
+
+        write_combined(out_path, merged_records(run_files), count, source_files)
+
+    print(f"Combined {count} articles from {len(source_files)} files ({stats['duplicates']} duplicates dropped)")
+    print(f"Wrote combined file at {out_path} (index: {index_path(out_path)})")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,120 @@
+"""Random access to output/combined_news_*.txt through its byte-offset index.
+
+combine_outputs.py writes <file>.index.jsonl next to each combined file:
+one line per article with its byte offset and length in the text file,
+plus its source, URL and title. The reader memory-maps the text file and
+slices articles out of it without scanning.
+
+Usage:
+    python combined_reader.py [FILE] --article 12
+    python combined_reader.py [FILE] --url https://www.cbc.ca/news/...
+    python combined_reader.py [FILE] --source "CBC News Canada"
+    python combined_reader.py [FILE] --list-sources
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import sys
+
+
+def index_path(text_path):
+    return text_path + ".index.jsonl"
+
+
+class CombinedReader:
+    """Memory-mapped view of a combined text file and its index"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(index_path(path), "r", encoding="utf-8") as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self.by_url = {entry["url"]: entry for entry in self.entries}
+        # Articles are sorted by source, so each source is one contiguous range
+        self.source_ranges = {}
+        for position, entry in enumerate(self.entries):
+            first, _ = self.source_ranges.get(entry["source"], (position, position))
+            self.source_ranges[entry["source"]] = (first, position)
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b""
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _slice(self, offset, length):
+        return self.map[offset:offset + length].decode("utf-8")
+
+    def article(self, number):
+        """Text of article number (1-based, as printed in the file)"""
+        entry = self.entries[number - 1]
+        return self._slice(entry["offset"], entry["length"])
+
+    def find_url(self, url):
+        """Text of the article with this URL, or None"""
+        entry = self.by_url.get(url)
+        return self._slice(entry["offset"], entry["length"]) if entry else None
+
+    def sources(self):
+        """(source, article count) in file order"""
+        return [(source, last - first + 1) for source, (first, last) in self.source_ranges.items()]
+
+    def source_text(self, source):
+        """All articles of one source, sliced out of the file in a single read"""
+        if source not in self.source_ranges:
+            return ""
+        first, last = self.source_ranges[source]
+        start = self.entries[first]["offset"]
+        end = self.entries[last]["offset"] + self.entries[last]["length"]
+        return self._slice(start, end - start)
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def latest_combined(directory="output"):
+    files = [f for f in glob.glob(os.path.join(directory, "combined_news_*.txt")) if os.path.exists(index_path(f))]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", help="combined text file (default: the newest indexed one in output/)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--article", type=int, help="print article N")
+    group.add_argument("--url", help="print the article with this URL")
+    group.add_argument("--source", help="print every article of this source")
+    group.add_argument("--list-sources", action="store_true", help="list sources and article counts")
+    args = parser.parse_args()
+
+    path = args.path or latest_combined()
+    if not path:
+        sys.exit("No indexed combined file found in output/")
+
+    with CombinedReader(path) as reader:
+        if args.list_sources:
+            for source, count in reader.sources():
+                print(f"{count:6d}  {source}")
+        elif args.article is not None:
+            if not 1 <= args.article <= len(reader):
+                sys.exit(f"{path} has {len(reader)} articles")
+            sys.stdout.write(reader.article(args.article))
+        elif args.url:
+            text = reader.find_url(args.url)
+            if text is None:
+                sys.exit(f"No article with URL {args.url}")
+            sys.stdout.write(text)
+        else:
+            sys.stdout.write(reader.source_text(args.source))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import csv
+import itertools
+import json
+import os
+import re
+import tempfile
+
+from archive import ARCHIVE_OUTPUT, ArchiveWriter, archive_path
+from run_manifest import file_entry
+
+EXPORT_DIR = "scraped_data"
+CHUNK_DIR = os.path.join(EXPORT_DIR, "chunks")
+
+# Columns of the CSV export; keys an article doesn't have are left empty
+ARTICLE_FIELDS = ["source", "title", "url", "content", "date_scraped"]
+
+# Characters of content kept in the summary file
+SUMMARY_CONTENT_CHARS = 200
+
+# Optional per-chunk token budget (estimated offline, see estimate_tokens);
+# 0 limits chunks by bytes only
+MAX_CHUNK_TOKENS = int(os.environ.get("SCRAPER_CHUNK_MAX_TOKENS", "0"))
+
+# "sequential" keeps articles in order; "binpack" reorders them into fewer, fuller chunks
+CHUNK_PACKING = os.environ.get("SCRAPER_CHUNK_PACKING", "sequential")
+
+# Framing of the JSON array files (see JSONArrayWriter)
+ARRAY_OPEN = b"[\n"
+ARRAY_SEPARATOR = b",\n"
+ARRAY_CLOSE = b"\n]\n"
+FRAMING_TOKENS = 2
+SEPARATOR_TOKENS = 1
+
+# Rough BPE-style pieces: runs of up to four word characters, or a single
+# punctuation character. Close to (slightly above) real tokenizer counts
+# for English and French prose, and needs no vocabulary.
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+_SEGMENT_RE = re.compile(r"\S+\s*")
+
+
+def encode_article(article):
+    """Serialize an article once; the bytes are shared by every JSON sink"""
+    return json.dumps(article, ensure_ascii=False).encode("utf-8")
+
+
+def summarize(article):
+    """The article with its content cut to the first SUMMARY_CONTENT_CHARS characters"""
+    content = article.get('content')
+    if content is None or len(content) <= SUMMARY_CONTENT_CHARS:
+        return article
+    return dict(article, content=content[:SUMMARY_CONTENT_CHARS] + "...")
+
+
+def estimate_tokens(data):
+    """Fast offline estimate of how many tokens an LLM tokenizer will produce"""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return len(_TOKEN_RE.findall(data))
+
+
+def _escaped(text):
+    # The text as it appears inside a JSON string (escaping is per character)
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+def split_article(article, max_size_bytes, max_tokens=0):
+    """Split an article whose record can't fit in one chunk into records that each fit
+
+    Content is cut at paragraph breaks where possible, then between words
+    (and inside a word only when a single word is over budget).
+    Each part keeps the other fields and gains "part" and "parts";
+    concatenating the parts' content gives back the original content.
+    """
+    overhead = encode_article(dict(article, content="", part=99999, parts=99999))
+    byte_budget = max_size_bytes - len(ARRAY_OPEN) - len(ARRAY_CLOSE) - len(overhead)
+    token_budget = max_tokens - FRAMING_TOKENS - estimate_tokens(overhead) if max_tokens else 0
+    if byte_budget <= 0 or (max_tokens and token_budget <= 0):
+        raise ValueError(f"Chunk budget too small for the fields of {article.get('url')}")
+
+    # Costs of pieces add up: exactly for bytes, and never below the estimate
+    # for the joined text for tokens
+    def cost(text):
+        escaped = _escaped(text)
+        return len(escaped.encode("utf-8")), estimate_tokens(escaped) if max_tokens else 0
+
+    def fits(length, tokens):
+        return length <= byte_budget and (not max_tokens or tokens <= token_budget)
+
+    # Paragraphs (with their trailing break), then words for any paragraph
+    # that is itself over budget, then characters for an over-budget word
+    segments = []
+    for paragraph in re.findall(r".+?(?:\n\n|$)", article.get('content') or "", re.S):
+        if fits(*cost(paragraph)):
+            segments.append(paragraph)
+            continue
+        for word in _SEGMENT_RE.findall(paragraph):
+            if fits(*cost(word)):
+                segments.append(word)
+                continue
+            while word:
+                # Longest prefix of the word that still fits
+                low, high = 1, len(word)
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    if fits(*cost(word[:middle])):
+                        low = middle
+                    else:
+                        high = middle - 1
+                segments.append(word[:low])
+                word = word[low:]
+
+    contents = []
+    current, current_length, current_tokens = [], 0, 0
+    for segment in segments:
+        length, tokens = cost(segment)
+        if current and not fits(current_length + length, current_tokens + tokens):
+            contents.append("".join(current))
+            current, current_length, current_tokens = [], 0, 0
+        current.append(segment)
+        current_length += length
+        current_tokens += tokens
+    if current:
+        contents.append("".join(current))
+
+    return [dict(article, content=content, part=i, parts=len(contents)) for i, content in enumerate(contents, 1)]
+
+
+class JSONArrayWriter:
+    """Writes pre-encoded records as a JSON array, one record per line"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.file = open(path, "wb")
+        self.file.write(ARRAY_OPEN)
+
+    def write(self, encoded):
+        if self.count:
+            self.file.write(ARRAY_SEPARATOR)
+        self.file.write(encoded)
+        self.count += 1
+
+    def close(self):
+        self.file.write(ARRAY_CLOSE if self.count else b"]\n")
+        self.file.close()
+
+
+class ChunkPacker:
+    """Packs pre-encoded records into JSON array files within a byte (and optional token) budget
+
+    Sizes are exact: a chunk's file size is the framing plus its records
+    and separators, so no chunk file exceeds max_size_bytes. "sequential"
+    packing keeps the articles in order and writes them as they arrive;
+    "binpack" spools the records to a temporary file and places them first
+    fit decreasing, which usually needs fewer chunks. Articles too large
+    for one chunk are split (see split_article). The total number of chunks
+    is part of each file name, so chunks are written under temporary names
+    and renamed once the last one is closed.
+    """
+
+    def __init__(self, base_filename, max_size_bytes, max_tokens=MAX_CHUNK_TOKENS, mode=CHUNK_PACKING):
+        if mode not in ("sequential", "binpack"):
+            raise ValueError(f"Unknown chunk packing mode: {mode}")
+        self.base_filename = base_filename
+        self.max_size_bytes = max_size_bytes
+        self.max_tokens = max_tokens
+        self.mode = mode
+        self.finished = []
+        self.chunk_files = []
+        self.records = 0
+        self.split = 0
+        # sequential: the chunk being filled
+        self.current = None
+        self.current_bytes = 0
+        self.current_tokens = 0
+        # binpack: (index, offset, length, tokens) of each spooled record
+        self.spool = tempfile.TemporaryFile() if mode == "binpack" else None
+        self.spooled = []
+
+    def fits(self, length, tokens, used_bytes=0, used_tokens=0):
+        """Whether a record fits in a chunk already holding used_bytes/used_tokens (0 = empty)"""
+        size, tokens = self._grow(used_bytes, used_tokens, length, tokens)
+        return size <= self.max_size_bytes and (not self.max_tokens or tokens <= self.max_tokens)
+
+    def _grow(self, used_bytes, used_tokens, length, tokens):
+        if used_bytes:
+            return used_bytes + len(ARRAY_SEPARATOR) + length, used_tokens + SEPARATOR_TOKENS + tokens
+        return len(ARRAY_OPEN) + length + len(ARRAY_CLOSE), FRAMING_TOKENS + tokens
+
+    def add(self, article, encoded):
+        """Add one article given its encoded bytes, splitting it if it can't fit in a chunk"""
+        tokens = estimate_tokens(encoded) if self.max_tokens else 0
+        if self.fits(len(encoded), tokens):
+            self._add(encoded, tokens)
+            return
+        self.split += 1
+        for part in split_article(article, self.max_size_bytes, self.max_tokens):
+            encoded = encode_article(part)
+            self._add(encoded, estimate_tokens(encoded) if self.max_tokens else 0)
+
+    def _add(self, encoded, tokens):
+        self.records += 1
+        if self.spool is not None:
+            self.spooled.append((len(self.spooled), self.spool.tell(), len(encoded), tokens))
+            self.spool.write(encoded)
+            return
+        if self.current is not None and not self.fits(len(encoded), tokens, self.current_bytes, self.current_tokens):
+            self._finish()
+        if self.current is None:
+            self.current = JSONArrayWriter(f"{self.base_filename}_chunk_{len(self.finished) + 1}.json.part")
+        self.current.write(encoded)
+        self.current_bytes, self.current_tokens = self._grow(self.current_bytes, self.current_tokens, len(encoded), tokens)
+
+    def _finish(self):
+        self.current.close()
+        self.finished.append(self.current)
+        self.current = None
+        self.current_bytes = 0
+        self.current_tokens = 0
+
+    def _write_bins(self):
+        """First fit decreasing over the spooled records, then write each bin in article order"""
+        bins = []  # [bytes, tokens, members]
+        for record in sorted(self.spooled, key=lambda r: r[2], reverse=True):
+            _, _, length, tokens = record
+            for chunk in bins:
+                if self.fits(length, tokens, chunk[0], chunk[1]):
+                    break
+            else:
+                chunk = [0, 0, []]
+                bins.append(chunk)
+            chunk[0], chunk[1] = self._grow(chunk[0], chunk[1], length, tokens)
+            chunk[2].append(record)
+
+        for chunk in sorted(bins, key=lambda b: min(r[0] for r in b[2])):
+            self.current = JSONArrayWriter(f"{self.base_filename}_chunk_{len(self.finished) + 1}.json.part")
+            for _, offset, length, _ in sorted(chunk[2]):
+                self.spool.seek(offset)
+                self.current.write(self.spool.read(length))
+            self._finish()
+        self.spool.close()
+
+    def close(self):
+        """Give every chunk its final name and return the number of chunks"""
+        if self.spool is not None:
+            self._write_bins()
+        elif self.current is not None:
+            self._finish()
+        total = len(self.finished)
+        total_bytes = 0
+        for i, chunk in enumerate(self.finished, 1):
+            chunk_filename = f"{self.base_filename}_chunk_{i}_of_{total}.json"
+            os.replace(chunk.path, chunk_filename)
+            self.chunk_files.append((chunk_filename, chunk.count))
+            size = os.path.getsize(chunk_filename)
+            total_bytes += size
+            print(f"Saved chunk {i}/{total} with {chunk.count} articles to {chunk_filename}")
+            print(f"Chunk size: {size / 1024:.2f} KB")
+        if total:
+            print(
+                f"Packed {self.records} records ({self.split} articles split) into {total} chunks "
+                f"({self.mode}), {total_bytes / (total * self.max_size_bytes):.0%} of the byte budget used"
+            )
+        return total
+
+
+def export_articles(articles, prefix, timestamp, fields=ARTICLE_FIELDS, max_chunk_bytes=90000):
+    """Write the full JSON, CSV, chunk, summary and archive exports in a single pass
+
+    articles may be any iterable (e.g. the run's JSONL stream); it is read
+    once and nothing is kept in memory besides the record being written.
+    Returns manifest entries (see run_manifest) for the files written.
+    """
+    articles = iter(articles)
+    first = next(articles, None)
+    if first is None:
+        print("No articles were scraped.")
+        return []
+
+    os.makedirs(CHUNK_DIR, exist_ok=True)
+    csv_filename = os.path.join(EXPORT_DIR, f"{prefix}_{timestamp}.csv")
+    json_filename = os.path.join(EXPORT_DIR, f"{prefix}_{timestamp}.json")
+    summary_filename = os.path.join(EXPORT_DIR, f"{prefix}_summary_{timestamp}.json")
+
+    full = JSONArrayWriter(json_filename)
+    summary = JSONArrayWriter(summary_filename)
+    chunks = ChunkPacker(os.path.join(CHUNK_DIR, f"{prefix}_{timestamp}"), max_chunk_bytes)
+    archive = None
+    if ARCHIVE_OUTPUT:
+        archive = ArchiveWriter(archive_path(prefix, timestamp))
+    with open(csv_filename, "w", newline="", encoding="utf-8") as csv_file:
+        rows = csv.DictWriter(csv_file, fieldnames=fields, extrasaction="ignore")
+        rows.writeheader()
+        for article in itertools.chain([first], articles):
+            encoded = encode_article(article)
+            full.write(encoded)
+            chunks.add(article, encoded)
+            rows.writerow(article)
+            short = summarize(article)
+            summary.write(encoded if short is article else encode_article(short))
+            if archive is not None:
+                archive.write(encoded, article.get('source'))
+    full.close()
+    summary.close()
+
+    print(f"Scraped {full.count} articles and saved to {csv_filename}")
+    print(f"Also saved data to {json_filename}")
+    total_chunks = chunks.close()
+    print(f"Split data into {total_chunks} chunks for easier uploading")
+    print(f"Created summary file at {summary_filename}")
+
+    files = [
+        file_entry(json_filename, "full", full.count),
+        file_entry(csv_filename, "csv", full.count),
+        file_entry(summary_filename, "summary", summary.count),
+    ]
+    files.extend(file_entry(path, "chunk", count) for path, count in chunks.chunk_files)
+    if archive is not None:
+        archive_filename = archive.close()
+        print(f"Archived {archive.count} articles to {archive_filename} "
+              f"({os.path.getsize(archive_filename)} bytes, {archive.codec})")
+        files.append(file_entry(archive_filename, "archive", archive.count))
+    return files
@@ -0,0 +1,216 @@
+import re
+import threading
+
+import soupsieve
+
+from html_parsers import parse_html, remove_elements, resolve_parser
+
+# Elements extract_metadata reads (kept when article pages are parsed partially)
+METADATA_SELECTORS = 'meta, link[rel="canonical"], time[datetime], [rel="author"], .byline, .author'
+
+# Fallbacks appended to a site's title selector on article pages
+TITLE_FALLBACK = ", h1.title, h1"
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def clean_text(text):
+    """Collapse whitespace runs and strip (same result as the scrapers' clean_text)"""
+    if text:
+        return _WHITESPACE.sub(' ', text).strip()
+    return ""
+
+
+class CompiledSelector:
+    """A CSS selector compiled once and reused for every page
+
+    BeautifulSoup trees use the compiled soupsieve pattern directly; the
+    selectolax adapter takes the selector string, which lexbor compiles
+    natively.
+    """
+
+    __slots__ = ("source", "pattern")
+
+    def __init__(self, source, parser):
+        self.source = source
+        self.pattern = None if parser == "selectolax" else soupsieve.compile(source)
+
+    def select(self, node):
+        if self.pattern is None:
+            return node.select(self.source)
+        return self.pattern.select(node)
+
+    def select_one(self, node):
+        if self.pattern is None:
+            return node.select_one(self.source)
+        return self.pattern.select_one(node)
+
+    def match(self, node):
+        if self.pattern is None:
+            return node.matches(self.source)
+        return self.pattern.match(node)
+
+
+class MetadataPlan:
+    """Compiled selectors for byline, published time and canonical URL
+
+    All of them are matched in a single traversal of the page; the first
+    match of each kind in document order is then used exactly as separate
+    select_one calls would.
+    """
+
+    KINDS = (
+        ("byline_meta", 'meta[name="author"], meta[property="article:author"]'),
+        ("byline_text", '[rel="author"], .byline, .author'),
+        ("published_meta", 'meta[property="article:published_time"], meta[name="pubdate"], meta[itemprop="datePublished"]'),
+        ("published_time", 'time[datetime]'),
+        ("canonical_link", 'link[rel="canonical"]'),
+        ("canonical_meta", 'meta[property="og:url"]'),
+    )
+
+    def __init__(self, parser):
+        self.kinds = [(name, CompiledSelector(selector, parser)) for name, selector in self.KINDS]
+        self.any = CompiledSelector(", ".join(selector for _, selector in self.KINDS), parser)
+
+    def first_matches(self, soup):
+        found = {}
+        for element in self.any.select(soup):
+            for name, selector in self.kinds:
+                if name not in found and selector.match(element):
+                    found[name] = element
+            if len(found) == len(self.kinds):
+                break
+        return found
+
+    def extract(self, soup):
+        found = self.first_matches(soup)
+        metadata = {}
+
+        byline = found.get("byline_meta")
+        if byline and byline.get('content'):
+            metadata['byline'] = clean_text(byline['content'])
+        else:
+            byline = found.get("byline_text")
+            if byline:
+                text = clean_text(byline.get_text())
+                if text:
+                    metadata['byline'] = text
+
+        published = found.get("published_meta")
+        if published and published.get('content'):
+            metadata['published'] = published['content'].strip()
+        else:
+            published = found.get("published_time")
+            if published:
+                metadata['published'] = published['datetime'].strip()
+
+        canonical = found.get("canonical_link")
+        if canonical and canonical.get('href'):
+            metadata['canonical_url'] = canonical['href'].strip()
+        else:
+            canonical = found.get("canonical_meta")
+            if canonical and canonical.get('content'):
+                metadata['canonical_url'] = canonical['content'].strip()
+
+        return metadata
+
+
+_metadata_plans = {}
+
+
+def extract_metadata(soup, parser=None):
+    """Read byline, published time and canonical URL from a parsed page when available"""
+    parser = resolve_parser(parser)
+    plan = _metadata_plans.get(parser)
+    if plan is None:
+        plan = _metadata_plans.setdefault(parser, MetadataPlan(parser))
+    return plan.extract(soup)
+
+
+class ExtractionPlan:
+    """Everything needed to extract articles for one distinct site configuration
+
+    Built once per configuration and shared by every site that uses it
+    (the Radio-Canada and CBC sections share a handful of plans). Selectors
+    are compiled up front, the exclusion selectors are merged into a single
+    pass over the content container, and the partial-parse keep list is
+    computed once.
+    """
+
+    def __init__(self, site):
+        self.parser = resolve_parser(site.get('parser'))
+        self.article = CompiledSelector(site['article_selector'], self.parser)
+        self.card_title = CompiledSelector(site['title_selector'], self.parser)
+        self.page_title = CompiledSelector(site['title_selector'] + TITLE_FALLBACK, self.parser)
+        self.container = CompiledSelector(site['content_container'], self.parser)
+        self.paragraphs = CompiledSelector(site['content_selector'], self.parser)
+        excludes = [selector for selector in site['exclude_selectors'] if selector.strip()]
+        self.exclude = CompiledSelector(", ".join(excludes), self.parser) if excludes else None
+        self.metadata = MetadataPlan(self.parser)
+        self.keep = [site['content_container'], self.page_title.source, METADATA_SELECTORS]
+
+    def extract(self, html, article_url=""):
+        """Parse an article page once and return its title, content and metadata"""
+        soup = parse_html(html, self.parser, keep=self.keep)
+
+        # Read the title and metadata before the exclusions below modify the tree
+        title_element = self.page_title.select_one(soup)
+        page = {
+            "title": clean_text(title_element.get_text()) if title_element else "",
+            "content": ""
+        }
+        page.update(self.metadata.extract(soup))
+
+        container = self.container.select_one(soup)
+        if not container:
+            print(f"No content container found for {article_url}")
+            return page
+
+        # One pass for all exclusion selectors
+        if self.exclude is not None:
+            remove_elements(self.exclude.select(container))
+
+        texts = []
+        for paragraph in self.paragraphs.select(container):
+            text = paragraph.get_text()
+            if text.strip():
+                texts.append(clean_text(text))
+        page['content'] = "\n\n".join(texts)
+        return page
+
+    def cards(self, soup):
+        """Article cards on a listing page"""
+        return self.article.select(soup)
+
+    def card_title_text(self, card):
+        """Title of a listing card, or "" when the card has none"""
+        title_element = self.card_title.select_one(card)
+        return clean_text(title_element.get_text()) if title_element else ""
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def plan_key(site):
+    return (
+        site['article_selector'],
+        site['title_selector'],
+        site['content_container'],
+        site['content_selector'],
+        tuple(site['exclude_selectors']),
+        site.get('parser'),
+    )
+
+
+def get_plan(site):
+    """Return the shared ExtractionPlan for a site's configuration, compiling it on first use"""
+    key = plan_key(site)
+    plan = _plans.get(key)
+    if plan is None:
+        with _plans_lock:
+            plan = _plans.get(key)
+            if plan is None:
+                plan = ExtractionPlan(site)
+                _plans[key] = plan
+    return plan
@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# Overall number of downloads allowed in flight at once
+MAX_CONCURRENT_FETCHES = int(os.environ.get("SCRAPER_MAX_CONCURRENCY", "32"))
+
+# Number of downloads allowed in flight against a single host
+MAX_FETCHES_PER_HOST = int(os.environ.get("SCRAPER_MAX_PER_HOST", "2"))
+
+
+def get_host(url):
+    """Return the lower-cased host of a URL (used to group requests per server)"""
+    return urlparse(url).netloc.lower()
+
+
+class FetchEngine:
+    """Thread pool that runs downloads concurrently with a per-host cap"""
+
+    def __init__(self, max_workers=MAX_CONCURRENT_FETCHES, max_per_host=MAX_FETCHES_PER_HOST):
+        self.max_workers = max(1, max_workers)
+        self.max_per_host = max(1, max_per_host)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch")
+        self._active = {}
+        self._waiting = {}
+        self._lock = threading.Lock()
+
+    def _start(self, host, future, fn, args, kwargs):
+        worker = self._executor.submit(fn, *args, **kwargs)
+        worker.add_done_callback(lambda done: self._finish(host, future, done))
+
+    def _finish(self, host, future, done):
+        if done.cancelled():
+            future.cancel()
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+
+        # Hand the freed host slot to the next queued job for that host, so
+        # jobs waiting on a busy server never tie up a worker thread
+        with self._lock:
+            queue = self._waiting.get(host)
+            if queue:
+                job = queue.popleft()
+            else:
+                job = None
+                self._active[host] -= 1
+        if job:
+            self._start(host, *job)
+
+    def submit(self, url, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs) under the host slot of url and return a Future"""
+        host = get_host(url)
+        future = Future()
+        with self._lock:
+            if self._active.get(host, 0) >= self.max_per_host:
+                self._waiting.setdefault(host, deque()).append((future, fn, args, kwargs))
+                return future
+            self._active[host] = self._active.get(host, 0) + 1
+        self._start(host, future, fn, args, kwargs)
+        return future
+
+    def map(self, fn, items, url_of=lambda item: item):
+        """Run fn over items concurrently and return the results in input order"""
+        futures = [self.submit(url_of(item), fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_fetch_engine():
+    """Return the process-wide fetch engine, creating it on first use"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = FetchEngine()
+        return _engine
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import Future
+
+from url_canonical import canonical_url, same_site
+
+
+def canonical_key(url):
+    """Key used to recognise the same page behind different spellings of its URL"""
+    return canonical_url(url)
+
+
+class CrawlFrontier:
+    """Run-wide set of article URLs plus single-flight coalescing of fetches
+
+    Every site list scraped in the process feeds the same frontier, so an
+    article listed by several sections (or by both rc.py and news_scraper.py
+    site lists) is claimed and downloaded only once. Requests for exactly
+    the same URL that are in flight at the same time share one download;
+    canonical keys are only used to claim articles, never to coalesce
+    fetches, since they drop query strings that select different pages.
+
+    Links are claimed as they appear on the listing pages. A link that is
+    only a duplicate after canonicalization (tracking parameters, fragment,
+    trailing slash, http/https, or the rel=canonical URL of a page already
+    fetched) counts as a fetch avoided by canonicalization.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.claimed = {}
+        self.spellings = set()
+        self.inflight = {}
+        self.duplicates = 0
+        self.canonicalized = 0
+        self.coalesced = 0
+
+    def claim(self, url, owner=""):
+        """Return True if url is new to this run and record owner as the site processing it"""
+        url = url.strip()
+        key = canonical_key(url)
+        with self.lock:
+            new_spelling = url not in self.spellings
+            self.spellings.add(url)
+            if key in self.claimed:
+                self.duplicates += 1
+                if new_spelling:
+                    self.canonicalized += 1
+                return False
+            self.claimed[key] = owner
+            return True
+
+    def alias(self, canonical, url, owner=""):
+        """Claim the rel=canonical URL of the page fetched from url and return the URL to record
+
+        Later links spelled like the page's canonical URL are then skipped.
+        A canonical URL on another site (syndicated copies) is ignored.
+        """
+        if not canonical:
+            return canonical_key(url)
+        canonical = canonical_url(canonical, url)
+        if not same_site(canonical, url):
+            return canonical_key(url)
+        with self.lock:
+            self.claimed.setdefault(canonical, owner)
+        return canonical
+
+    def single_flight(self, url, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs), or wait for the call already in flight for exactly the same url"""
+        key = url.strip()
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def summary(self):
+        with self.lock:
+            return (
+                f"Frontier: {len(self.claimed)} article URLs claimed, {self.duplicates} duplicate links skipped "
+                f"({self.canonicalized} fetches avoided by URL canonicalization), "
+                f"{self.coalesced} in-flight fetches coalesced"
+            )
+
+
+_frontier = CrawlFrontier()
+
+
+def get_frontier():
+    """Return the frontier shared by every scraper running in this process"""
+    return _frontier
+
+
+def reset_frontier():
+    """Replace the shared frontier with an empty one (for tools that replay the same pages repeatedly)"""
+    global _frontier
+    _frontier = CrawlFrontier()
+    return _frontier
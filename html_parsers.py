@@ -0,0 +1,262 @@
+import os
+import re
+from functools import lru_cache
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from bs4.filter import ElementFilter
+except ImportError:  # beautifulsoup4 < 4.13
+    ElementFilter = None
+
+# Parser used when a site config does not name one: "html.parser", "lxml",
+# "html5lib" or "selectolax". Engines that aren't installed fall back to
+# Python's built-in html.parser.
+DEFAULT_PARSER = os.environ.get("SCRAPER_PARSER", "html.parser")
+
+# Tree builders BeautifulSoup can use directly (same soup API, different speed)
+SOUP_BUILDERS = ("html.parser", "lxml", "html5lib")
+
+# Only build the subtrees callers ask for (see subtree_rules); set to 0 to
+# always build the full document
+PARTIAL_PARSE = os.environ.get("SCRAPER_PARTIAL_PARSE", "1") != "0"
+
+# Builders that honour parse_only while parsing (html5lib builds the full tree)
+PARTIAL_BUILDERS = ("html.parser", "lxml")
+
+_COMPOUND_RE = re.compile(
+    r"""^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:\.[\w-]+|\#[\w-]+|\[[\w-]+(?:=(?:"[^"]*"|'[^']*'|[\w-]+))?\])*)$"""
+)
+_PART_RE = re.compile(r"""\.([\w-]+)|\#([\w-]+)|\[([\w-]+)(?:=(?:"([^"]*)"|'([^']*)'|([\w-]+)))?\]""")
+
+_warned = set()
+
+
+def _module_available(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+@lru_cache(maxsize=None)
+def available_parsers():
+    """Return the parser backends that can run in this environment"""
+    parsers = ("html.parser",)
+    if _module_available("lxml"):
+        parsers += ("lxml",)
+    if _module_available("html5lib"):
+        parsers += ("html5lib",)
+    if _module_available("selectolax.lexbor"):
+        parsers += ("selectolax",)
+    return parsers
+
+
+def resolve_parser(name=None):
+    """Map a requested backend to one that is installed, falling back to html.parser"""
+    name = name or DEFAULT_PARSER
+    if name in available_parsers():
+        return name
+    if name not in _warned:
+        _warned.add(name)
+        print(f"Parser backend '{name}' is not available; falling back to html.parser")
+    return "html.parser"
+
+
+class SelectolaxNode:
+    """Wraps a selectolax node in the small part of the BeautifulSoup API the scrapers use
+
+    Selectors are the same CSS strings as in the site configs; lexbor
+    evaluates them natively, which is much faster than soupsieve.
+    """
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def name(self):
+        return self.node.tag
+
+    @property
+    def attrs(self):
+        # bs4 reports valueless attributes as empty strings
+        return {key: (value if value is not None else "") for key, value in self.node.attributes.items()}
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def select(self, selector):
+        return [SelectolaxNode(node) for node in self.node.css(selector)]
+
+    def select_one(self, selector):
+        node = self.node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def matches(self, selector):
+        return self.node.css_matches(selector)
+
+    def find(self, tag):
+        return self.select_one(tag)
+
+    def find_all(self, tag):
+        return self.select(tag)
+
+    def get_text(self):
+        return self.node.text(deep=True)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    def decompose(self):
+        self.node.decompose()
+
+
+def remove_elements(elements):
+    """Remove every element of a selection from its tree in one pass
+
+    Elements nested inside another element of the selection go away with
+    their ancestor and are not touched again (for selectolax that would
+    mean using freed nodes).
+    """
+    elements = list(elements)
+    if elements and isinstance(elements[0], SelectolaxNode):
+        selected = {element.node.mem_id for element in elements}
+        outermost = []
+        for element in elements:
+            parent = element.node.parent
+            while parent is not None and parent.mem_id not in selected:
+                parent = parent.parent
+            if parent is None:
+                outermost.append(element)
+        elements = outermost
+    for element in elements:
+        if not getattr(element, "decomposed", False):
+            element.decompose()
+
+
+def _compound_rule(compound):
+    """Turn a simple compound selector (tag, classes, id, [attr], [attr=value]) into a rule"""
+    match = _COMPOUND_RE.match(compound)
+    if not match or not compound:
+        return None
+    tag = match.group("tag")
+    rule = {"tag": None if tag in (None, "*") else tag.lower(), "classes": set(), "attrs": []}
+    for cls, ident, attr, dq, sq, bare in _PART_RE.findall(match.group("rest")):
+        if cls:
+            rule["classes"].add(cls)
+        elif ident:
+            rule["attrs"].append(("id", ident))
+        else:
+            value = dq or sq or bare
+            rule["attrs"].append((attr.lower(), value if (dq or sq or bare) else None))
+    return rule
+
+
+@lru_cache(maxsize=256)
+def subtree_rules(selectors):
+    """Rules for the top-level elements that must be kept to answer every selector
+
+    selectors is a comma-separated CSS selector list. For "X Y" or "X > Y"
+    only X subtrees need to exist, since every match lies inside one.
+    Returns None when a selector can't be handled this way (sibling
+    combinators, pseudo-classes, substring attribute matches, ...).
+    """
+    rules = []
+    for part in selectors.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if any(c in part for c in "+~:") or "*=" in part or "^=" in part or "$=" in part:
+            return None
+        first = re.split(r"\s*>\s*|\s+", part)[0]
+        rule = _compound_rule(first)
+        if rule is None:
+            return None
+        rules.append(rule)
+    return tuple(rules) if rules else None
+
+
+def _rule_matches(rule, name, attrs):
+    if rule["tag"] and rule["tag"] != name:
+        return False
+    if rule["classes"]:
+        classes = attrs.get("class") or ""
+        if isinstance(classes, (list, tuple)):
+            classes = " ".join(classes)
+        if not rule["classes"].issubset(classes.split()):
+            return False
+    for attr, value in rule["attrs"]:
+        actual = attrs.get(attr)
+        if actual is None:
+            return False
+        if isinstance(actual, (list, tuple)):
+            actual = " ".join(actual)
+        if value is not None and actual != value:
+            return False
+    return True
+
+
+def _keep_tag(rules, name, attrs):
+    attrs = attrs or {}
+    return any(_rule_matches(rule, name, attrs) for rule in rules)
+
+
+if ElementFilter is not None:
+    class SubtreeFilter(ElementFilter):
+        """parse_only filter that only lets matching subtrees (and their contents) be built"""
+
+        def __init__(self, rules):
+            super().__init__()
+            self.rules = rules
+
+        @property
+        def includes_everything(self):
+            return False
+
+        def allow_tag_creation(self, nsprefix, name, attrs):
+            return _keep_tag(self.rules, name, attrs)
+
+        def allow_string_creation(self, string):
+            # Only reached for text outside every kept subtree
+            return False
+
+        def match(self, element, _known_rules=False):
+            return True
+
+
+def _parse_only(rules):
+    if ElementFilter is not None:
+        return SubtreeFilter(rules)
+    # Older BeautifulSoup calls a callable name with the raw tag name and attributes
+    return SoupStrainer(lambda name, attrs=None: _keep_tag(rules, name, attrs))
+
+
+def parse_html(html, parser=None, keep=None):
+    """Parse an HTML document with the requested backend and return a soup-like root
+
+    html may be str or bytes. The result supports select/select_one/find/
+    find_all/get_text/decompose and attribute access for every backend.
+
+    keep is an optional list of CSS selectors the caller is going to run.
+    With a BeautifulSoup builder that supports it, only the subtrees those
+    selectors can match are materialised and the rest of the page is
+    discarded while parsing; selectors run on the result return the same
+    elements as on the full document.
+    """
+    parser = resolve_parser(parser)
+    if parser == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+        return SelectolaxNode(LexborHTMLParser(html).root)
+
+    if keep and PARTIAL_PARSE and parser in PARTIAL_BUILDERS:
+        rules = subtree_rules(", ".join(keep))
+        if rules:
+            return BeautifulSoup(html, parser, parse_only=_parse_only(rules))
+    return BeautifulSoup(html, parser)
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Persistent response cache shared by both scrapers
+HTTP_CACHE_DIR = os.environ.get("SCRAPER_HTTP_CACHE_DIR", "scraped_data/http_cache")
+# Off by default while requests go to another server (SCRAPER_HOST_OVERRIDE):
+# fresh entries would otherwise be served without contacting it at all
+HTTP_CACHE_ENABLED = os.environ.get(
+    "SCRAPER_HTTP_CACHE", "0" if os.environ.get("SCRAPER_HOST_OVERRIDE") else "1"
+) != "0"
+
+# Entries younger than this are served without contacting the server at all
+# (lets rc.py and news_scraper.py share pages within one workflow run)
+HTTP_CACHE_FRESH_SECONDS = float(os.environ.get("SCRAPER_HTTP_CACHE_FRESH_SECONDS", "3600"))
+
+# Eviction limits, applied when the cache is opened
+HTTP_CACHE_MAX_AGE_DAYS = float(os.environ.get("SCRAPER_HTTP_CACHE_MAX_AGE_DAYS", "30"))
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("SCRAPER_HTTP_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+
+# Response headers kept with each entry
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class CacheEntry:
+    """One cached response: its validators and the path of its body on disk"""
+
+    def __init__(self, meta, body_path):
+        self.meta = meta
+        self.body_path = body_path
+
+    def is_fresh(self, fresh_seconds):
+        return time.time() - self.meta.get("stored_at", 0) < fresh_seconds
+
+    def validators(self):
+        """Conditional request headers for revalidating this entry"""
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+    def to_response(self, url):
+        """Rebuild a requests.Response from the cached body"""
+        with open(self.body_path, "rb") as f:
+            body = f.read()
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = url
+        response._content = body
+        response.headers = CaseInsensitiveDict(self.meta.get("headers", {}))
+        response.encoding = self.meta.get("encoding")
+        return response
+
+
+class HTTPCache:
+    """On-disk response cache keyed by URL with ETag/Last-Modified revalidation"""
+
+    def __init__(self, directory=HTTP_CACHE_DIR, fresh_seconds=HTTP_CACHE_FRESH_SECONDS,
+                 max_age_days=HTTP_CACHE_MAX_AGE_DAYS, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max_age_days * 86400
+        self.max_bytes = max_bytes
+        self.counts = {"hit": 0, "miss": 0, "revalidated": 0, "changed": 0, "stored": 0, "evicted": 0}
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.prune()
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".meta", base + ".body"
+
+    def record(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def lookup(self, url):
+        """Return the CacheEntry for url, or None if nothing usable is stored"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not os.path.exists(body_path):
+            return None
+        if time.time() - meta.get("stored_at", 0) > self.max_age_seconds:
+            return None
+        return CacheEntry(meta, body_path)
+
+    def store(self, url, response):
+        """Save a 200 response body with its validators"""
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            "url": url,
+            "stored_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding,
+            "headers": {k: response.headers[k] for k in STORED_HEADERS if k in response.headers},
+            "size": len(response.content),
+        }
+        # Write to temporary files and rename so a concurrent reader (or the
+        # other scraper) never sees a half-written entry
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as f:
+            f.write(response.content)
+        os.replace(body_path + suffix, body_path)
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + suffix, meta_path)
+        self.record("stored")
+
+    def refresh(self, entry):
+        """Restart the freshness window of an entry the server confirmed unchanged"""
+        entry.meta["stored_at"] = time.time()
+        meta_path = entry.body_path[:-len(".body")] + ".meta"
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(entry.meta, f)
+        os.replace(meta_path + suffix, meta_path)
+
+    def _remove(self, meta_path):
+        for path in (meta_path, meta_path[:-len(".meta")] + ".body"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.counts["evicted"] += 1
+
+    def prune(self):
+        """Drop entries older than the age limit, then the oldest until under the size limit"""
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".meta"):
+                    continue
+                meta_path = os.path.join(root, name)
+                try:
+                    with open(meta_path, "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    self._remove(meta_path)
+                    continue
+                if now - meta.get("stored_at", 0) > self.max_age_seconds:
+                    self._remove(meta_path)
+                    continue
+                entries.append((meta.get("stored_at", 0), meta.get("size", 0), meta_path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, meta_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(meta_path)
+            total -= size
+
+    def summary(self):
+        with self.lock:
+            c = dict(self.counts)
+        return (
+            f"HTTP cache: {c['hit']} hits, {c['revalidated']} revalidated (304), "
+            f"{c['changed']} changed, {c['miss']} misses, {c['stored']} stored, {c['evicted']} evicted"
+        )
+
+
+def iter_cached_pages(directory=HTTP_CACHE_DIR):
+    """Yield (url, body bytes, encoding) for every entry stored under directory"""
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.endswith(".meta"):
+                continue
+            meta_path = os.path.join(root, name)
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                with open(meta_path[:-len(".meta")] + ".body", "rb") as f:
+                    yield meta["url"], f.read(), meta.get("encoding")
+            except (OSError, ValueError, KeyError):
+                continue
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Return the process-wide HTTP cache, or None when caching is disabled"""
+    global _cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HTTPCache()
+        return _cache
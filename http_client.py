@@ -0,0 +1,270 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from fetch_engine import get_host
+from frontier import get_frontier
+from http_cache import get_http_cache
+from resilience import (
+    BREAKER, CONNECT_TIMEOUT, MAX_ATTEMPTS, MAX_RETRY_AFTER, RETRY_ERRORS, RETRY_STATUSES,
+    backoff_delay, parse_retry_after,
+)
+from scheduler import pause_host, wait_for_host
+
+# Number of distinct hosts whose connection pools are kept open
+POOL_CONNECTIONS = int(os.environ.get("SCRAPER_POOL_CONNECTIONS", "32"))
+
+# Number of keep-alive connections kept open per host
+POOL_MAXSIZE = int(os.environ.get("SCRAPER_POOL_MAXSIZE", "8"))
+
+# Send the requests for some or all hosts to another server instead, such as
+# tools/replay_server.py: "http://127.0.0.1:8800" for every host, or
+# "www.cbc.ca=http://127.0.0.1:8800,ici.radio-canada.ca=http://127.0.0.1:8801".
+# The path and query are kept and the original host goes in the Host header;
+# rate limiting, statistics and responses (response.url, error messages)
+# still see the original URL. The HTTP cache is off unless
+# SCRAPER_HTTP_CACHE=1 is set as well.
+HOST_OVERRIDE = os.environ.get("SCRAPER_HOST_OVERRIDE", "")
+
+# Brotli is only advertised when a decoder is installed, otherwise urllib3
+# would hand back compressed bytes it cannot decode
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
+class TransportStats:
+    """Counters for requests, new connections and bytes per host"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def _host(self, host):
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = {"requests": 0, "connections": 0, "wire_bytes": 0, "body_bytes": 0}
+            self.hosts[host] = stats
+        return stats
+
+    def record_connection(self, host):
+        with self.lock:
+            self._host(host)["connections"] += 1
+
+    def record_response(self, host, wire_bytes, body_bytes):
+        with self.lock:
+            stats = self._host(host)
+            stats["requests"] += 1
+            stats["wire_bytes"] += wire_bytes
+            stats["body_bytes"] += body_bytes
+
+    def totals(self):
+        with self.lock:
+            totals = {"requests": 0, "connections": 0, "wire_bytes": 0, "body_bytes": 0}
+            for stats in self.hosts.values():
+                for key in totals:
+                    totals[key] += stats[key]
+        totals["reused"] = max(0, totals["requests"] - totals["connections"])
+        totals["saved_bytes"] = max(0, totals["body_bytes"] - totals["wire_bytes"])
+        return totals
+
+
+STATS = TransportStats()
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        STATS.record_connection(self.host)
+        return super()._new_conn()
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        STATS.record_connection(self.host)
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose per-host pools count every new TCP/TLS connection"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+def parse_host_override(value):
+    """Map of host (or "*" for every host) to the base URL its requests are sent to"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        host, sep, base = item.rpartition("=")
+        overrides[host.lower() if sep else "*"] = base.rstrip("/")
+    return overrides
+
+
+HOST_OVERRIDES = parse_host_override(HOST_OVERRIDE)
+
+
+def route(url, headers):
+    """The URL to send a request for url to, and its headers, after applying HOST_OVERRIDES"""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    base = HOST_OVERRIDES.get(host, HOST_OVERRIDES.get("*"))
+    if not base:
+        return url, headers
+    target = urlsplit(base)
+    headers = dict(headers or {}, Host=parts.netloc)
+    return urlunsplit((target.scheme, target.netloc, parts.path or "/", parts.query, "")), headers
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """Build a session with keep-alive connection pools shared by all fetches"""
+    session = requests.Session()
+    adapter = PooledAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def send(url, headers, timeout, attempts=MAX_ATTEMPTS):
+    """Send a GET with retries, backoff and the per-host circuit breaker
+
+    Connection errors, timeouts, truncated bodies and retryable statuses
+    are retried with full-jitter exponential backoff. Request errors and
+    5xx responses count as failures for the circuit breaker; a host that
+    throttles (429, or a 503 with Retry-After) does not, and a Retry-After
+    pauses the whole host in the rate limiter instead. Either way a
+    half-open trial always resolves. The last response (or error) is
+    returned (or raised) once the attempts run out.
+    """
+    host = get_host(url)
+    target, headers = route(url, headers)
+    for attempt in range(attempts):
+        BREAKER.before_request(host)
+        wait_for_host(url)
+        try:
+            response = get_session().get(target, headers=headers, timeout=(CONNECT_TIMEOUT, timeout))
+        except requests.exceptions.RequestException as e:
+            BREAKER.record_failure(host)
+            if not isinstance(e, RETRY_ERRORS) or attempt == attempts - 1:
+                raise
+            wait_time = backoff_delay(attempt)
+            print(f"Error fetching {url}: {e}; retrying in {wait_time:.2f} seconds...")
+            time.sleep(wait_time)
+            continue
+
+        if target != url:
+            # raise_for_status and the scrapers report the page, not the replay server
+            response.url = url
+        if response.status_code not in RETRY_STATUSES:
+            BREAKER.record_success(host)
+            return response
+
+        retry_after = None
+        if response.status_code in (429, 503):
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None or response.status_code == 429:
+            BREAKER.record_throttled(host)
+        else:
+            BREAKER.record_failure(host)
+        if attempt == attempts - 1:
+            return response
+        if retry_after is not None:
+            if retry_after > MAX_RETRY_AFTER:
+                print(f"{url} asked us to wait {retry_after:.0f} seconds; giving up")
+                return response
+            print(f"{url} returned {response.status_code}; pausing {host} for {retry_after:.2f} seconds")
+            pause_host(url, retry_after)
+        else:
+            wait_time = backoff_delay(attempt)
+            print(f"{url} returned {response.status_code}; retrying in {wait_time:.2f} seconds...")
+            time.sleep(wait_time)
+
+
+def fetch(url, headers=None, timeout=15):
+    """GET url through the shared pooled session, with rate limiting, retries and caching
+
+    timeout is the read timeout; connecting is bounded separately by
+    CONNECT_TIMEOUT. When the HTTP cache is enabled, recent entries are
+    served from disk and older ones are revalidated with If-None-Match /
+    If-Modified-Since. A request for a URL already in flight (spelled
+    exactly the same) shares its download through the crawl frontier.
+    """
+    return get_frontier().single_flight(url, _fetch, url, headers, timeout)
+
+
+def _fetch(url, headers, timeout):
+    cache = get_http_cache()
+    entry = cache.lookup(url) if cache else None
+    if entry and entry.is_fresh(cache.fresh_seconds):
+        cache.record("hit")
+        return entry.to_response(url)
+
+    request_headers = dict(headers or {})
+    if entry:
+        request_headers.update(entry.validators())
+
+    response = send(url, request_headers, timeout)
+
+    # raw.tell() is what came over the wire (possibly compressed),
+    # content is the decoded body handed to the parser
+    body_bytes = len(response.content)
+    try:
+        wire_bytes = response.raw.tell()
+    except Exception:
+        wire_bytes = body_bytes
+    STATS.record_response(get_host(url), wire_bytes, body_bytes)
+
+    if cache:
+        if entry and response.status_code == 304:
+            cache.record("revalidated")
+            cache.refresh(entry)
+            return entry.to_response(url)
+        cache.record("changed" if entry else "miss")
+        if response.status_code == 200:
+            cache.store(url, response)
+    return response
+
+
+def print_transport_stats():
+    """Print connection reuse, compression savings and cache counts for this run"""
+    totals = STATS.totals()
+    if totals["requests"]:
+        print(
+            f"HTTP: {totals['requests']} requests over {totals['connections']} connections "
+            f"({totals['reused']} handshakes saved by keep-alive)"
+        )
+        print(
+            f"HTTP: {totals['wire_bytes'] / 1024:.1f} KB on the wire for {totals['body_bytes'] / 1024:.1f} KB "
+            f"of HTML ({totals['saved_bytes'] / 1024:.1f} KB saved by compression)"
+        )
+    cache = get_http_cache()
+    if cache:
+        print(cache.summary())
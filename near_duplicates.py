@@ -0,0 +1,165 @@
+import hashlib
+import os
+import re
+from array import array
+
+# Collapse articles whose content is nearly identical (the same wire story
+# carried by several sections under different URLs); set to 0 to disable
+NEAR_DUP_ENABLED = os.environ.get("SCRAPER_NEAR_DUP", "1") != "0"
+
+# Estimated Jaccard similarity of word shingles above which two articles
+# are considered the same story
+NEAR_DUP_THRESHOLD = float(os.environ.get("SCRAPER_NEAR_DUP_THRESHOLD", "0.8"))
+
+# Words per shingle and MinHash signature length
+SHINGLE_WORDS = 5
+SIGNATURE_SIZE = 64
+
+_WORD_RE = re.compile(r"\w+")
+_EMPTY = (1 << 64) - 1
+
+
+def shingle_hashes(text, size=SHINGLE_WORDS):
+    """64-bit hashes of the overlapping word n-grams of a text (case and punctuation ignored)"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") for g in grams}
+
+
+def minhash(hashes, size=SIGNATURE_SIZE):
+    """One-permutation MinHash signature: the minimum hash in each of size buckets
+
+    A single pass over the shingles (instead of one per permutation).
+    Empty buckets borrow the value of the next non-empty bucket, offset by
+    the distance, so similar sets still agree bucket by bucket.
+    """
+    signature = array("Q", [_EMPTY]) * size
+    for h in hashes:
+        bucket = h % size
+        value = h // size
+        if value < signature[bucket]:
+            signature[bucket] = value
+    filled = [i for i in range(size) if signature[i] != _EMPTY]
+    if filled and len(filled) < size:
+        for i in range(size):
+            if signature[i] == _EMPTY:
+                j = next((k for k in filled if k > i), filled[0])
+                signature[i] = (signature[j] + (j - i) % size * 0x9E3779B97F4A7C15) & ((1 << 58) - 1)
+    return signature
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def lsh_bands(threshold, size=SIGNATURE_SIZE):
+    """Number of LSH bands for a threshold
+
+    Two signatures become candidates when every row of at least one band
+    matches, which is likely above roughly (1/bands) ** (1/rows). The
+    most selective banding whose curve still sits comfortably below the
+    threshold is used, so true near-duplicates are not missed.
+    """
+    best = size
+    for bands in range(size, 0, -1):
+        if size % bands:
+            continue
+        rows = size // bands
+        if (1 / bands) ** (1 / rows) <= threshold - 0.1:
+            best = bands
+    return best
+
+
+class NearDuplicateIndex:
+    """LSH index over the canonical copies seen so far
+
+    Each new article is compared only with the canonical articles that
+    share an LSH bucket with it (not with every article), and becomes a
+    duplicate of the most similar one above the threshold or else a new
+    canonical copy. Only signatures are kept, never content.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, size=SIGNATURE_SIZE):
+        self.threshold = threshold
+        self.size = size
+        self.bands = lsh_bands(threshold, size)
+        self.rows = size // self.bands
+        self.buckets = {}
+        self.signatures = {}
+
+    def _keys(self, signature):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, key, text):
+        """Return (canonical key, similarity) if text nearly duplicates a known article, else index it"""
+        hashes = shingle_hashes(text or "")
+        if not hashes:
+            return None
+        signature = minhash(hashes, self.size)
+        candidates = set()
+        for bucket in self._keys(signature):
+            candidates.update(self.buckets.get(bucket, ()))
+        best = None
+        for candidate in candidates:
+            score = similarity(signature, self.signatures[candidate])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (candidate, score)
+        if best is not None:
+            return best
+        self.signatures[key] = signature
+        for bucket in self._keys(signature):
+            self.buckets.setdefault(bucket, []).append(key)
+        return None
+
+
+def collapse_near_duplicates(articles, threshold=NEAR_DUP_THRESHOLD):
+    """Yield each story once, with the URLs and sources of its near-duplicate copies
+
+    articles must be iterable twice (a list, or an ArticleFile over the
+    run's JSONL stream). The first pass finds the duplicates from
+    signatures alone; the second streams the articles again, dropping
+    duplicates and adding an "alternates" list to the first copy of each
+    story.
+    """
+    yield from collapse_near_duplicate_groups([articles], threshold)[0]
+
+
+def collapse_near_duplicate_groups(groups, threshold=NEAR_DUP_THRESHOLD):
+    """collapse_near_duplicates over several article lists sharing one index
+
+    Returns one generator per list. A story keeps its first copy, in
+    whichever list that is; copies in later lists are dropped and listed
+    as its alternates.
+    """
+    index = NearDuplicateIndex(threshold)
+    alternates = {}
+    duplicates = set()
+    for group, articles in enumerate(groups):
+        for position, article in enumerate(articles):
+            match = index.add((group, position), article.get('content'))
+            if match is not None:
+                canonical, score = match
+                duplicates.add((group, position))
+                alternates.setdefault(canonical, []).append(
+                    {"url": article.get('url'), "source": article.get('source'), "similarity": round(score, 2)}
+                )
+
+    if duplicates:
+        print(f"Near-duplicates: merged {len(duplicates)} articles into {len(alternates)} stories "
+              f"(threshold {threshold})")
+    return [_without_duplicates(group, articles, duplicates, alternates) for group, articles in enumerate(groups)]
+
+
+def _without_duplicates(group, articles, duplicates, alternates):
+    for position, article in enumerate(articles):
+        key = (group, position)
+        if key in duplicates:
+            continue
+        if key in alternates:
+            article = dict(article, alternates=alternates[key])
+        yield article
@@ -1,14 +1,23 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import csv
 from datetime import datetime
-import time
 import os
 import re
-import random
-import json
-import math
+
+from article_store import get_article_store
+from article_stream import STREAM_OUTPUT, ArticleFile, close_article_stream, get_article_stream, open_article_stream
+from exporter import ARTICLE_FIELDS, export_articles
+from fetch_engine import get_fetch_engine
+from extraction_plan import get_plan
+from frontier import get_frontier
+from html_parsers import parse_html
+from http_client import fetch
+from near_duplicates import NEAR_DUP_ENABLED, collapse_near_duplicates
+from pipeline import get_parse_pool
+from run_manifest import record_run
+from run_teardown import finish_run
+from scheduler import run_sites_by_host
+from seen_index import get_seen_index
+from url_canonical import canonical_url
 
 # Create directories to store scraped data
 if not os.path.exists("scraped_data"):
@@ -19,6 +28,9 @@ if not os.path.exists("scraped_data/chunks"):
 # Maximum size for each JSON chunk (about 90K tokens or roughly 70% of Claude's context window)
 MAX_CHUNK_SIZE_BYTES = 90000
 
+# Prefix of this scraper's output files under scraped_data/
+OUTPUT_PREFIX = "news_articles"
+
 # Fixed capitalization - ensure this matches the reference in the main() function
 NEWS_SITES = [
     {
@@ -211,7 +223,7 @@ NEWS_SITES = [
         "content_container": ".content__article-body, .article-body-commercial-selector",
         "content_selector": "p",
         "exclude_selectors": [".submeta", ".content-footer", ".block-share"],
-        "base_url": "https://www.cbc.ca/",
+        "base_url": "https://www.cbc.ca",
         "max_articles": 18
     },
 
@@ -361,8 +373,14 @@ def get_full_url(url, base_url):
             return domain + url
     return base_url + url
 
-def extract_article_content(article_url, site):
-    """Visit the article page and extract the full content"""
+def parse_article_page(html, site, article_url=""):
+    """Parse a downloaded article page once and return its title, content and metadata"""
+    # The site's compiled extraction plan is shared by every site with the
+    # same selectors; it only builds the title, metadata and content subtrees
+    return get_plan(site).extract(html, article_url)
+
+def extract_article(article_url, site):
+    """Visit the article page once and extract its title, content and metadata"""
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         "Accept-Language": "en-US,en;q=0.9,fr;q=0.8",
@@ -372,39 +390,32 @@ def extract_article_content(article_url, site):
     }
     
     try:
-        response = requests.get(article_url, headers=headers, timeout=15)
+        response = fetch(article_url, headers=headers, timeout=15)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find the content container
-        content_container = soup.select_one(site['content_container'])
-        if not content_container:
-            print(f"No content container found for {article_url}")
-            return ""
-        
-        # Remove excluded elements
-        for exclude_selector in site['exclude_selectors']:
-            for element in content_container.select(exclude_selector):
-                element.decompose()
-        
-        # Extract all paragraphs
-        paragraphs = content_container.select(site['content_selector'])
-        
-        # Combine paragraphs into full text
-        full_text = "\n\n".join([clean_text(p.get_text()) for p in paragraphs if p.get_text().strip()])
-        
-        return full_text
+        # Parsing runs in the CPU stage (a worker process when enabled) on the raw bytes
+        return get_parse_pool().run(parse_article_page, response.content, response.encoding, site, article_url)
+    
+    except requests.exceptions.RequestException as e:
+        # Already retried by the shared HTTP layer (or the host's circuit is open)
+        print(f"Failed to fetch {article_url}: {e}")
+        return None
     
     except Exception as e:
         print(f"Error extracting content from {article_url}: {e}")
-        return ""
+        return None
+
+def extract_article_content(article_url, site):
+    """Visit the article page and extract the full content"""
+    page = extract_article(article_url, site)
+    return page['content'] if page else ""
 
 def find_article_links(soup, site, max_articles=15):
     """Find links to articles on the main page with deduplication"""
     article_links = []
     seen_urls = set()  # Track URLs we've already found
-    article_elements = soup.select(site['article_selector'])
+    plan = get_plan(site)
+    article_elements = plan.cards(soup)
     
     for article in article_elements:
         try:
@@ -427,12 +438,23 @@ def find_article_links(soup, site, max_articles=15):
                     continue
                 seen_urls.add(full_url)
                 
+                # One spelling per article (no tracking params, fragment, etc.)
+                article_url = canonical_url(full_url)
+                
+                # In incremental mode skip articles captured by earlier runs
+                if get_seen_index().should_skip(article_url):
+                    continue
+                
+                # Skip articles this or another site in this run has already
+                # claimed, under any spelling of their URL
+                if not get_frontier().claim(full_url, site['name']):
+                    continue
+                
                 # Extract title if available at this stage
-                title_element = article.select_one(site['title_selector'])
-                title = clean_text(title_element.text) if title_element else ""
+                title = plan.card_title_text(article)
                 
                 article_links.append({
-                    'url': full_url,
+                    'url': article_url,
                     'title': title
                 })
                 
@@ -444,6 +466,46 @@ def find_article_links(soup, site, max_articles=15):
     
     return article_links
 
+def process_article(article_data, site, index=0, total=1):
+    """Fetch one article found on a listing page and build its record (runs on a fetch worker)"""
+    try:
+        article_url = article_data['url']
+        preliminary_title = article_data['title']
+        
+        print(f"Processing article {index+1}/{total}: {article_url}")
+        
+        # Download and parse the article page once for content, title and metadata
+        page = extract_article(article_url, site)
+        if not page:
+            return None
+        
+        # Fall back to the article page's title when the listing card had none
+        title = preliminary_title or page['title']
+        
+        # Record the article under the page's own rel=canonical URL, and
+        # claim it so links spelled that way are not fetched again
+        article_url = get_frontier().alias(page.get('canonical_url'), article_url, site['name'])
+        
+        # Only add articles with content
+        article = None
+        if title and page['content']:
+            article = {
+                "source": site['name'],
+                "title": title,
+                "url": article_url,
+                "content": page['content'],
+                "date_scraped": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            for key in ('byline', 'published', 'canonical_url'):
+                if page.get(key):
+                    article[key] = page[key]
+        
+        return article
+        
+    except Exception as e:
+        print(f"Error processing article: {e}")
+        return None
+
 def scrape_website(site):
     """Scrape a single website for news articles including full content"""
     print(f"Scraping {site['name']}...")
@@ -454,10 +516,10 @@ def scrape_website(site):
     }
     
     try:
-        response = requests.get(site['url'], headers=headers, timeout=15)
+        response = fetch(site['url'], headers=headers, timeout=15)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, site.get('parser'))
         articles = []
         
         # Find article links from the main page
@@ -465,42 +527,25 @@ def scrape_website(site):
         
         print(f"Found {len(article_links)} articles on {site['name']}")
         
-        for i, article_data in enumerate(article_links):
-            try:
-                article_url = article_data['url']
-                preliminary_title = article_data['title']
-                
-                print(f"Processing article {i+1}/{len(article_links)}: {article_url}")
-                
-                # Extract the full content from the article page
-                full_content = extract_article_content(article_url, site)
-                
-                # If we couldn't extract the title from the main page, try from the article page
-                title = preliminary_title
-                if not title:
-                    # Try to revisit the article page to get the title if we don't have it
-                    article_response = requests.get(article_url, headers=headers, timeout=10)
-                    article_soup = BeautifulSoup(article_response.text, 'html.parser')
-                    title_element = article_soup.select_one(site['title_selector'] + ", h1.title, h1")
-                    if title_element:
-                        title = clean_text(title_element.text)
-                
-                # Only add articles with content
-                if title and full_content:
-                    articles.append({
-                        "source": site['name'],
-                        "title": title,
-                        "url": article_url,
-                        "content": full_content,
-                        "date_scraped": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                
-                # Add random delay between article requests (1-3 seconds)
-                time.sleep(random.uniform(1, 3))
-                
-            except Exception as e:
-                print(f"Error processing article: {e}")
-                continue
+        # Download and parse the articles concurrently; results come back in
+        # listing order so the output is the same as a sequential pass
+        engine = get_fetch_engine()
+        stream = get_article_stream(OUTPUT_PREFIX)
+        store = get_article_store()
+        futures = [
+            engine.submit(article_data['url'], process_article, article_data, site, i, len(article_links))
+            for i, article_data in enumerate(article_links)
+        ]
+        for future in futures:
+            article = future.result()
+            if article:
+                if stream is not None:
+                    # Written out right away instead of kept until the end of the run
+                    stream.write(article)
+                else:
+                    articles.append(article)
+                if store is not None:
+                    store.add(article)
                 
         return articles
         
@@ -508,108 +553,61 @@ def scrape_website(site):
         print(f"Error scraping {site['name']}: {e}")
         return []
 
-def chunk_articles(articles, max_size_bytes=MAX_CHUNK_SIZE_BYTES):
-    """Split articles into chunks that fit within the maximum size limit"""
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for article in articles:
-        # Estimate the size of the article in bytes (approximate)
-        article_json = json.dumps(article, ensure_ascii=False)
-        article_size = len(article_json.encode('utf-8'))
-        
-        # If adding this article would exceed the maximum size, start a new chunk
-        if current_size + article_size > max_size_bytes and current_chunk:
-            chunks.append(current_chunk)
-            current_chunk = []
-            current_size = 0
-        
-        # Add the article to the current chunk
-        current_chunk.append(article)
-        current_size += article_size
-    
-    # Add the last chunk if it's not empty
-    if current_chunk:
-        chunks.append(current_chunk)
-    
-    return chunks
-
-def save_chunks(chunks, base_filename):
-    """Save chunks to separate JSON files"""
-    for i, chunk in enumerate(chunks):
-        chunk_filename = f"{base_filename}_chunk_{i+1}_of_{len(chunks)}.json"
-        with open(chunk_filename, 'w', encoding='utf-8') as f:
-            json.dump(chunk, f, ensure_ascii=False, indent=2)
-        print(f"Saved chunk {i+1}/{len(chunks)} with {len(chunk)} articles to {chunk_filename}")
-        
-        # Calculate approximate size
-        file_size = os.path.getsize(chunk_filename)
-        print(f"Chunk size: {file_size / 1024:.2f} KB")
-
-def main():
-    """Main function to scrape all websites and save data in manageable chunks"""
+def collect_unique_articles(sites, results, global_seen_urls=None):
+    """Merge per-site results in site order, dropping URLs already collected in this run"""
     all_articles = []
     
     # Global URL tracking to avoid duplicates across sites
-    global_seen_urls = set()
+    if global_seen_urls is None:
+        global_seen_urls = set()
     
-    for site in NEWS_SITES:
-        site_articles = scrape_website(site)
-        
+    # Persistent index of articles captured by this and earlier runs
+    seen_index = get_seen_index()
+    
+    for site, site_articles in zip(sites, results):
         # Additional global deduplication
         unique_articles = []
         for article in site_articles:
             if article['url'] not in global_seen_urls:
                 global_seen_urls.add(article['url'])
                 unique_articles.append(article)
+                seen_index.add_article(article)
         
         all_articles.extend(unique_articles)
         print(f"Scraped {len(unique_articles)} unique articles from {site['name']}")
-        
-        # Pause between sites to avoid overloading servers (5-10 seconds)
-        pause_time = random.uniform(5, 10)
-        print(f"Pausing for {pause_time:.2f} seconds before next site...")
-        time.sleep(pause_time)
     
+    return all_articles
+
+def save_articles(all_articles, timestamp=None):
+    """Save the collected articles as CSV, JSON, chunks and a summary file"""
     # Create timestamp for filenames
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if timestamp is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
-    # Save all articles to a single CSV (for reference)
-    csv_filename = f"scraped_data/news_articles_{timestamp}.csv"
+    # One pass over the articles writes every export (JSON, CSV, chunks, summary and archive)
+    return export_articles(all_articles, OUTPUT_PREFIX, timestamp, ARTICLE_FIELDS + ['byline', 'published', 'canonical_url'], MAX_CHUNK_SIZE_BYTES)
+
+def main():
+    """Main function to scrape all websites and save data in manageable chunks"""
+    # Sites sharing a host are crawled one after the other, different hosts
+    # in parallel; the per-host rate limiter keeps each server paced
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    stream = open_article_stream(OUTPUT_PREFIX, timestamp) if STREAM_OUTPUT else None
+    results = run_sites_by_host(NEWS_SITES, scrape_website)
     
-    if all_articles:
-        df = pd.DataFrame(all_articles)
-        df.to_csv(csv_filename, index=False, encoding='utf-8')
-        print(f"Scraped {len(all_articles)} articles and saved to {csv_filename}")
-        
-        # Save a single JSON file (may be large)
-        json_filename = f"scraped_data/news_articles_{timestamp}.json"
-        df.to_json(json_filename, orient='records', force_ascii=False, indent=2)
-        print(f"Also saved data to {json_filename}")
-        
-        # Split into smaller chunks for easier upload to Claude
-        chunks = chunk_articles(all_articles)
-        chunk_base_filename = f"scraped_data/chunks/news_articles_{timestamp}"
-        save_chunks(chunks, chunk_base_filename)
-        print(f"Split data into {len(chunks)} chunks for easier uploading")
-        
-        # Create a summary file with minimal content
-        summary_articles = []
-        for article in all_articles:
-            # Copy the article but truncate content
-            summary = article.copy()
-            if 'content' in summary:
-                # Keep just the first 200 characters of content for the summary
-                summary['content'] = summary['content'][:200] + "..." if len(summary['content']) > 200 else summary['content']
-            summary_articles.append(summary)
-            
-        summary_filename = f"scraped_data/news_articles_summary_{timestamp}.json"
-        with open(summary_filename, 'w', encoding='utf-8') as f:
-            json.dump(summary_articles, f, ensure_ascii=False, indent=2)
-        print(f"Created summary file at {summary_filename}")
+    if stream is not None:
+        close_article_stream(OUTPUT_PREFIX)
+        stream.report(NEWS_SITES)
+        print(f"Streamed articles to {stream.path}")
+        all_articles = ArticleFile(stream.path)
     else:
-        print("No articles were scraped.")
+        all_articles = collect_unique_articles(NEWS_SITES, results)
+    if NEAR_DUP_ENABLED:
+        # One copy of each story carried by several sections, with the others as alternates
+        all_articles = collapse_near_duplicates(all_articles)
+    record_run(timestamp, OUTPUT_PREFIX, save_articles(all_articles, timestamp), stream)
+    
+    finish_run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""Process-pool CPU stage for article extraction.
+
+Downloads stay on the fetch threads (I/O stage); parsing and text cleanup
+run in worker processes so extraction is not limited to one core by the
+GIL. Raw response bytes and their encoding are handed over, and decoding
+happens in the worker. A bounded number of pages may wait for a worker;
+past that, fetch threads block on submit, which slows the I/O stage down
+to what the CPU stage can absorb.
+
+Replaying archived pages from the HTTP cache measures the CPU stage on
+its own:
+
+    python pipeline.py --replay scraped_data/http_cache --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Worker processes for parsing; 0 or 1 parses inline on the fetch threads
+PARSE_WORKERS = int(os.environ.get("SCRAPER_PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Pages allowed to wait for a parse worker, per worker, before fetches block
+PARSE_QUEUE_PER_WORKER = int(os.environ.get("SCRAPER_PARSE_QUEUE_PER_WORKER", "4"))
+
+
+def decode_body(body, encoding):
+    """Decode response bytes the way the parser should see them"""
+    if encoding:
+        return body.decode(encoding, errors="replace")
+    # Unknown charset: let the parser sniff the bytes (meta charset, BOM, ...)
+    return body
+
+
+def _run_parse(fn, body, encoding, args):
+    return fn(decode_body(body, encoding), *args)
+
+
+class ParsePool:
+    """Bounded process pool that runs parse functions on raw page bytes"""
+
+    def __init__(self, workers=PARSE_WORKERS, queue_per_worker=PARSE_QUEUE_PER_WORKER):
+        self.workers = workers
+        self.executor = None
+        self.slots = None
+        self.lock = threading.Lock()
+        if workers > 1:
+            self.slots = threading.BoundedSemaphore(workers * max(1, queue_per_worker))
+
+    def _executor(self):
+        with self.lock:
+            if self.executor is None:
+                # forkserver/spawn: forking a process full of fetch threads
+                # could copy locks held by those threads into the workers
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self.executor
+
+    def submit(self, fn, body, encoding, *args):
+        """Queue fn(decoded body, *args) on a worker; blocks while the queue is full"""
+        self.slots.acquire()
+        try:
+            future = self._executor().submit(_run_parse, fn, body, encoding, args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def run(self, fn, body, encoding, *args):
+        """Run fn(decoded body, *args) in the CPU stage and return its result
+
+        fn must be a module-level function so it can be sent to a worker.
+        """
+        if self.slots is None:
+            return _run_parse(fn, body, encoding, args)
+        return self.submit(fn, body, encoding, *args).result()
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """Return the process-wide parse pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool()
+        return _pool
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def replay(cache_dir, workers, limit=None):
+    """Run the CPU stage over archived pages and return (pages, bytes, seconds)"""
+    import news_scraper
+    from fetch_engine import get_host
+    from http_cache import iter_cached_pages
+
+    site_for_host = {}
+    for site in news_scraper.NEWS_SITES:
+        site_for_host.setdefault(get_host(site['url']), site)
+
+    pool = ParsePool(workers)
+    futures = []
+    pages = 0
+    total_bytes = 0
+    start = time.perf_counter()
+    for url, body, encoding in iter_cached_pages(cache_dir):
+        site = site_for_host.get(get_host(url))
+        if site is None:
+            continue
+        if limit and pages >= limit:
+            break
+        pages += 1
+        total_bytes += len(body)
+        if pool.slots is None:
+            pool.run(news_scraper.parse_article_page, body, encoding, site, url)
+        else:
+            futures.append(pool.submit(news_scraper.parse_article_page, body, encoding, site, url))
+    for future in futures:
+        future.result()
+    pool.shutdown()
+    return pages, total_bytes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay archived HTML through the parse stage")
+    parser.add_argument("--replay", default="scraped_data/http_cache", help="HTTP cache directory to replay")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, PARSE_WORKERS])
+    parser.add_argument("--limit", type=int, help="replay at most this many pages")
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        pages, total_bytes, seconds = replay(args.replay, workers, args.limit)
+        seconds = seconds or 1e-9
+        print(
+            f"{workers} worker(s): {pages} pages, {total_bytes / 1e6:.2f} MB in {seconds:.2f}s "
+            f"({pages / seconds:.1f} pages/s, {total_bytes / 1e6 / seconds:.2f} MB/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
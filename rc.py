@@ -1,14 +1,21 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import csv
 from datetime import datetime
-import time
 import os
 import re
-import random
-import json
-import math
+
+from article_store import get_article_store
+from article_stream import STREAM_OUTPUT, ArticleFile, close_article_stream, get_article_stream, open_article_stream
+from exporter import ARTICLE_FIELDS, export_articles
+from frontier import get_frontier
+from html_parsers import parse_html
+from http_client import fetch
+from near_duplicates import NEAR_DUP_ENABLED, collapse_near_duplicates
+from pipeline import get_parse_pool
+from run_manifest import record_run
+from run_teardown import finish_run
+from scheduler import run_sites_by_host
+from seen_index import get_seen_index
+from url_canonical import canonical_url
 
 # Create directories to store scraped data
 if not os.path.exists("scraped_data"):
@@ -19,6 +26,9 @@ if not os.path.exists("scraped_data/chunks"):
 # Maximum size for each JSON chunk
 MAX_CHUNK_SIZE_BYTES = 90000
 
+# Prefix of this scraper's output files under scraped_data/
+OUTPUT_PREFIX = "radio_canada_articles"
+
 # Radio-Canada sites to scrape
 RADIO_CANADA_SITES = [
     {
@@ -91,8 +101,8 @@ def get_full_url(url, base_url="https://ici.radio-canada.ca"):
         return base_url + url
     return base_url + '/' + url
 
-def fetch_page(url):
-    """Fetch a page with error handling and retry logic"""
+def fetch_response(url):
+    """Fetch a page with error handling and retry logic, returning the response"""
     headers = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         "Accept-Language": "en-US,en;q=0.9,fr;q=0.8",
@@ -100,29 +110,28 @@ def fetch_page(url):
         "Connection": "keep-alive"
     }
     
-    MAX_RETRIES = 3
-    for attempt in range(MAX_RETRIES):
-        try:
-            print(f"Fetching {url} (Attempt {attempt + 1}/{MAX_RETRIES})")
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching {url}: {e}")
-            if attempt < MAX_RETRIES - 1:
-                wait_time = random.uniform(2, 5) * (attempt + 1)
-                print(f"Retrying in {wait_time:.2f} seconds...")
-                time.sleep(wait_time)
-            else:
-                print(f"Failed to fetch {url} after {MAX_RETRIES} attempts.")
-                return None
+    # Retries, backoff, Retry-After and the per-host circuit breaker are
+    # handled by the shared HTTP layer
+    try:
+        print(f"Fetching {url}")
+        response = fetch(url, headers=headers, timeout=30)
+        response.raise_for_status()
+        return response
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to fetch {url}: {e}")
+        return None
+
+def fetch_page(url):
+    """Fetch a page and return its HTML"""
+    response = fetch_response(url)
+    return response.text if response is not None else None
 
 def extract_article_links(html, site_url):
     """Extract article links from a Radio-Canada page"""
     if not html:
         return []
     
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = parse_html(html)
     article_links = []
     seen_urls = set()
     
@@ -166,6 +175,13 @@ def extract_article_links(html, site_url):
                 
             seen_urls.add(full_url)
             
+            # One spelling per article (no tracking params, fragment, etc.)
+            article_url = canonical_url(full_url)
+            
+            # In incremental mode skip articles captured by earlier runs
+            if get_seen_index().should_skip(article_url):
+                continue
+            
             # Extract the title
             title = None
             
@@ -183,12 +199,14 @@ def extract_article_links(html, site_url):
             if not title:
                 title = f"Article from {site_url}"
             
+            # The link as found is kept so the frontier can tell spellings apart
             article_links.append({
-                'url': full_url,
+                'url': article_url,
+                'link': full_url,
                 'title': title
             })
             
-            print(f"Found article: {title} - {full_url}")
+            print(f"Found article: {title} - {article_url}")
             
         except Exception as e:
             print(f"Error processing article element: {e}")
@@ -196,17 +214,36 @@ def extract_article_links(html, site_url):
     
     return article_links
 
+# Selectors used on Radio-Canada article pages
+ARTICLE_TITLE_SELECTOR = 'h1, .article-title, .title'
+ARTICLE_CONTENT_SELECTORS = [
+    'article p', 
+    '.article-body-container p', 
+    '.article-body p', 
+    '.editorial-content p',
+    'main p',
+    '.content p'
+]
+ARTICLE_CONTAINER_SELECTOR = 'article, .article, main, .article-content, .content'
+ARTICLE_CANONICAL_SELECTOR = 'link[rel="canonical"]'
+
 def extract_article_content(url):
     """Extract content from a Radio-Canada article"""
-    html = fetch_page(url)
-    if not html:
-        return None, None
+    response = fetch_response(url)
+    if response is None or not response.content:
+        return None, None, None
     
-    soup = BeautifulSoup(html, 'html.parser')
+    # Parsing runs in the CPU stage (a worker process when enabled) on the raw bytes
+    return get_parse_pool().run(parse_article_html, response.content, response.encoding)
+
+def parse_article_html(html):
+    """Extract the title, content and rel=canonical URL of a Radio-Canada article page"""
+    # Only build the subtrees the selectors below can match
+    soup = parse_html(html, keep=[ARTICLE_TITLE_SELECTOR, ARTICLE_CONTAINER_SELECTOR, ARTICLE_CANONICAL_SELECTOR] + ARTICLE_CONTENT_SELECTORS)
     
     # Extract title if not already found
     title = None
-    title_element = soup.select_one('h1, .article-title, .title')
+    title_element = soup.select_one(ARTICLE_TITLE_SELECTOR)
     if title_element:
         title = clean_text(title_element.text)
     
@@ -214,16 +251,7 @@ def extract_article_content(url):
     content = ""
     
     # Try different selectors for article content
-    content_selectors = [
-        'article p', 
-        '.article-body-container p', 
-        '.article-body p', 
-        '.editorial-content p',
-        'main p',
-        '.content p'
-    ]
-    
-    for selector in content_selectors:
+    for selector in ARTICLE_CONTENT_SELECTORS:
         paragraphs = soup.select(selector)
         if paragraphs:
             content = "\n\n".join([clean_text(p.text) for p in paragraphs if p.text.strip()])
@@ -232,13 +260,16 @@ def extract_article_content(url):
     # If still no content, try a more generic approach
     if not content:
         # Try to find the main content container
-        main_content = soup.select_one('article, .article, main, .article-content, .content')
+        main_content = soup.select_one(ARTICLE_CONTAINER_SELECTOR)
         if main_content:
             # Get all paragraphs within the main content
             paragraphs = main_content.find_all('p')
             content = "\n\n".join([clean_text(p.text) for p in paragraphs if p.text.strip()])
     
-    return title, content
+    canonical = soup.select_one(ARTICLE_CANONICAL_SELECTOR)
+    canonical = canonical.get('href') if canonical else None
+    
+    return title, content, canonical
 
 def scrape_radio_canada_site(site):
     """Scrape a Radio-Canada site"""
@@ -256,8 +287,18 @@ def scrape_radio_canada_site(site):
     article_links = extract_article_links(html, site['url'])
     print(f"Found {len(article_links)} articles on {site['name']}")
     
-    # Limit to maximum number of articles
-    article_links = article_links[:site['max_articles']]
+    # Limit to maximum number of articles, skipping any that another site
+    # in this run has already claimed
+    frontier = get_frontier()
+    claimed_links = []
+    for article_data in article_links:
+        if len(claimed_links) >= site['max_articles']:
+            break
+        if frontier.claim(article_data['link'], site['name']):
+            claimed_links.append(article_data)
+    article_links = claimed_links
+    stream = get_article_stream(OUTPUT_PREFIX)
+    store = get_article_store()
     
     # Process each article
     for i, article_data in enumerate(article_links):
@@ -268,7 +309,11 @@ def scrape_radio_canada_site(site):
             print(f"Processing article {i+1}/{len(article_links)}: {article_url}")
             
             # Extract article content
-            title, content = extract_article_content(article_url)
+            title, content, canonical = extract_article_content(article_url)
+            
+            # Record the article under the page's own rel=canonical URL, and
+            # claim it so links spelled that way are not fetched again
+            article_url = frontier.alias(canonical, article_url, site['name'])
             
             # Use preliminary title if no title was found
             if not title:
@@ -276,87 +321,53 @@ def scrape_radio_canada_site(site):
             
             # Only add articles with content
             if title and content and len(content) > 100:  # Ensure we have substantial content
-                articles.append({
+                article = {
                     "source": site['name'],
                     "title": title,
                     "url": article_url,
                     "content": content,
                     "date_scraped": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                })
+                }
+                if stream is not None:
+                    # Written out right away instead of kept until the end of the run
+                    stream.write(article)
+                else:
+                    articles.append(article)
+                if store is not None:
+                    store.add(article)
                 print(f"Added article: {title}")
             else:
                 print(f"Skipping article: Missing title or sufficient content for {article_url}")
             
-            # Add a delay between article requests
-            delay = random.uniform(1, 3)
-            print(f"Waiting {delay:.2f} seconds before next article...")
-            time.sleep(delay)
-            
         except Exception as e:
             print(f"Error processing article: {e}")
             continue
     
     return articles
 
-def chunk_articles(articles, max_size_bytes=MAX_CHUNK_SIZE_BYTES):
-    """Split articles into chunks that fit within the maximum size limit"""
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for article in articles:
-        # Estimate the size of the article in bytes (approximate)
-        article_json = json.dumps(article, ensure_ascii=False)
-        article_size = len(article_json.encode('utf-8'))
-        
-        # If adding this article would exceed the maximum size, start a new chunk
-        if current_size + article_size > max_size_bytes and current_chunk:
-            chunks.append(current_chunk)
-            current_chunk = []
-            current_size = 0
-        
-        # Add the article to the current chunk
-        current_chunk.append(article)
-        current_size += article_size
-    
-    # Add the last chunk if it's not empty
-    if current_chunk:
-        chunks.append(current_chunk)
-    
-    return chunks
-
-def save_chunks(chunks, base_filename):
-    """Save chunks to separate JSON files"""
-    for i, chunk in enumerate(chunks):
-        chunk_filename = f"{base_filename}_chunk_{i+1}_of_{len(chunks)}.json"
-        with open(chunk_filename, 'w', encoding='utf-8') as f:
-            json.dump(chunk, f, ensure_ascii=False, indent=2)
-        print(f"Saved chunk {i+1}/{len(chunks)} with {len(chunk)} articles to {chunk_filename}")
-        
-        # Calculate approximate size
-        file_size = os.path.getsize(chunk_filename)
-        print(f"Chunk size: {file_size / 1024:.2f} KB")
-
-def main():
-    """Main function to scrape Radio-Canada sites"""
+def collect_unique_articles(sites, results, global_seen_urls=None):
+    """Merge per-site results in site order, dropping URLs already collected in this run"""
     all_articles = []
     
     # Global URL tracking to avoid duplicates across sites
-    global_seen_urls = set()
+    if global_seen_urls is None:
+        global_seen_urls = set()
     
     # Track successful sites
     successful_sites = 0
     
-    for site in RADIO_CANADA_SITES:
+    # Persistent index of articles captured by this and earlier runs
+    seen_index = get_seen_index()
+    
+    for site, site_articles in zip(sites, results):
         try:
-            site_articles = scrape_radio_canada_site(site)
-            
             # Deduplicate articles
             unique_articles = []
             for article in site_articles:
                 if article['url'] not in global_seen_urls:
                     global_seen_urls.add(article['url'])
                     unique_articles.append(article)
+                    seen_index.add_article(article)
             
             all_articles.extend(unique_articles)
             print(f"Scraped {len(unique_articles)} unique articles from {site['name']}")
@@ -364,55 +375,44 @@ def main():
             if len(unique_articles) > 0:
                 successful_sites += 1
             
-            # Pause between sites
-            pause_time = random.uniform(3, 7)
-            print(f"Pausing for {pause_time:.2f} seconds before next site...")
-            time.sleep(pause_time)
-            
         except Exception as e:
             print(f"Error processing site {site['name']}: {e}")
             continue
     
+    print(f"Successfully scraped {successful_sites} out of {len(sites)} sites")
+    return all_articles
+
+def save_articles(all_articles, timestamp=None):
+    """Save the collected Radio-Canada articles as CSV, JSON, chunks and a summary file"""
     # Create timestamp for filenames
+    if timestamp is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    # One pass over the articles writes every export (JSON, CSV, chunks, summary and archive)
+    return export_articles(all_articles, OUTPUT_PREFIX, timestamp, ARTICLE_FIELDS, MAX_CHUNK_SIZE_BYTES)
+
+def main():
+    """Main function to scrape Radio-Canada sites"""
+    # All sections share one host, so the scheduler crawls them in turn while
+    # the per-host rate limiter in fetch_page paces the requests
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    stream = open_article_stream(OUTPUT_PREFIX, timestamp) if STREAM_OUTPUT else None
+    results = run_sites_by_host(RADIO_CANADA_SITES, scrape_radio_canada_site)
     
-    # Save all articles to files
-    if all_articles:
+    if stream is not None:
+        close_article_stream(OUTPUT_PREFIX)
+        successful_sites = stream.report(RADIO_CANADA_SITES)
         print(f"Successfully scraped {successful_sites} out of {len(RADIO_CANADA_SITES)} sites")
-        print(f"Total articles collected: {len(all_articles)}")
-        
-        # Save to CSV
-        csv_filename = f"scraped_data/radio_canada_articles_{timestamp}.csv"
-        df = pd.DataFrame(all_articles)
-        df.to_csv(csv_filename, index=False, encoding='utf-8')
-        print(f"Saved articles to {csv_filename}")
-        
-        # Save to JSON
-        json_filename = f"scraped_data/radio_canada_articles_{timestamp}.json"
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump(all_articles, f, ensure_ascii=False, indent=2)
-        print(f"Also saved data to {json_filename}")
-        
-        # Split into chunks
-        chunks = chunk_articles(all_articles)
-        chunk_base_filename = f"scraped_data/chunks/radio_canada_articles_{timestamp}"
-        save_chunks(chunks, chunk_base_filename)
-        print(f"Split data into {len(chunks)} chunks for easier uploading")
-        
-        # Create summary file
-        summary_articles = []
-        for article in all_articles:
-            summary = article.copy()
-            if 'content' in summary:
-                summary['content'] = summary['content'][:200] + "..." if len(summary['content']) > 200 else summary['content']
-            summary_articles.append(summary)
-        
-        summary_filename = f"scraped_data/radio_canada_articles_summary_{timestamp}.json"
-        with open(summary_filename, 'w', encoding='utf-8') as f:
-            json.dump(summary_articles, f, ensure_ascii=False, indent=2)
-        print(f"Created summary file at {summary_filename}")
+        print(f"Streamed articles to {stream.path}")
+        all_articles = ArticleFile(stream.path)
     else:
-        print("No articles were scraped.")
+        all_articles = collect_unique_articles(RADIO_CANADA_SITES, results)
+    if NEAR_DUP_ENABLED:
+        # One copy of each story carried by several sections, with the others as alternates
+        all_articles = collapse_near_duplicates(all_articles)
+    record_run(timestamp, OUTPUT_PREFIX, save_articles(all_articles, timestamp), stream)
+    
+    finish_run()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,110 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# Attempts per request (the first try included)
+MAX_ATTEMPTS = int(os.environ.get("SCRAPER_MAX_ATTEMPTS", "3"))
+
+# Exponential backoff: attempt n waits a random time up to base * 2**n, capped
+BACKOFF_BASE = float(os.environ.get("SCRAPER_BACKOFF_BASE", "1.0"))
+BACKOFF_CAP = float(os.environ.get("SCRAPER_BACKOFF_CAP", "30"))
+
+# Longest Retry-After we are willing to honour before giving up on a request
+MAX_RETRY_AFTER = float(os.environ.get("SCRAPER_MAX_RETRY_AFTER", "120"))
+
+# Connecting should be quick; the read timeout is what callers pass in
+CONNECT_TIMEOUT = float(os.environ.get("SCRAPER_CONNECT_TIMEOUT", "5"))
+
+# Circuit breaker: stop calling a host after this many consecutive
+# failures, then let a single trial request through after the cooldown
+BREAKER_THRESHOLD = int(os.environ.get("SCRAPER_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("SCRAPER_BREAKER_COOLDOWN", "300"))
+
+# Statuses worth retrying; 429 and 503 may carry a Retry-After header
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Transport errors worth retrying (a connection dropped mid-body included);
+# any other request error fails the attempt without a retry
+RETRY_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff for the given (0-based) retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value):
+    """Return the Retry-After header value in seconds, or None if it can't be read"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker counting consecutive failures"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = {}
+        self.opened_at = {}
+        self.trial = set()
+        self.lock = threading.Lock()
+
+    def before_request(self, host):
+        """Raise CircuitOpenError if requests to host are currently blocked"""
+        with self.lock:
+            opened = self.opened_at.get(host)
+            if opened is None:
+                return
+            if time.monotonic() - opened < self.cooldown or host in self.trial:
+                raise CircuitOpenError(f"circuit open for {host} after {self.failures[host]} consecutive failures")
+            # Cooldown over: let one trial request through (half-open)
+            self.trial.add(host)
+
+    def record_success(self, host):
+        with self.lock:
+            if host in self.opened_at:
+                print(f"Circuit for {host} closed again")
+            self.failures.pop(host, None)
+            self.opened_at.pop(host, None)
+            self.trial.discard(host)
+
+    def record_throttled(self, host):
+        """End a half-open trial on a 429 or a Retry-After without counting a failure"""
+        with self.lock:
+            self.trial.discard(host)
+
+    def record_failure(self, host):
+        with self.lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+            self.trial.discard(host)
+            if self.failures[host] >= self.threshold:
+                if host not in self.opened_at:
+                    print(f"Circuit for {host} opened after {self.failures[host]} consecutive failures")
+                self.opened_at[host] = time.monotonic()
+
+
+BREAKER = CircuitBreaker()
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# One manifest per run lists every file the scrapers produced, so readers
+# such as combine_outputs.py find their inputs without globbing scraped_data
+MANIFEST_DIR = os.path.join("scraped_data", "manifests")
+
+# Maps each output prefix (e.g. "news_articles") to the id of its latest run
+LATEST_MANIFEST = os.path.join(MANIFEST_DIR, "latest.json")
+
+# Kinds of files a run produces
+KINDS = ("stream", "full", "csv", "summary", "chunk", "archive")
+
+_lock = threading.Lock()
+
+
+def file_entry(path, kind, articles):
+    """Manifest entry for one output file"""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown output kind: {kind}")
+    return {"path": path, "kind": kind, "articles": articles, "bytes": os.path.getsize(path)}
+
+
+def manifest_path(run_id, directory=MANIFEST_DIR):
+    return os.path.join(directory, f"run_{run_id}.json")
+
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def record_run(run_id, prefix, files, stream=None, directory=MANIFEST_DIR):
+    """Add one scraper's output files to the manifest of a run and mark the run as its latest
+
+    stream is the run's ArticleStream, if articles were streamed; it is
+    recorded on its own when opened, then again with the other outputs.
+    Both scrapers of a scrape_all.py run share the run id and therefore
+    one manifest.
+    """
+    if stream is not None:
+        files = [file_entry(stream.path, "stream", stream.count)] + list(files)
+    os.makedirs(directory, exist_ok=True)
+    path = manifest_path(run_id, directory)
+    with _lock:
+        manifest = _load(path) or {"run_id": run_id, "outputs": {}}
+        articles = max((f["articles"] for f in files if f["kind"] in ("stream", "full")), default=0)
+        manifest["outputs"][prefix] = {
+            "articles": articles,
+            "bytes": sum(f["bytes"] for f in files),
+            "files": files,
+        }
+        manifest["updated"] = datetime.now().isoformat(timespec="seconds")
+        _write(path, manifest)
+
+        latest_path = os.path.join(directory, os.path.basename(LATEST_MANIFEST))
+        latest = _load(latest_path) or {}
+        latest[prefix] = run_id
+        _write(latest_path, latest)
+    print(f"Recorded {len(files)} {prefix} files in {path}")
+    return path
+
+
+def latest_run(prefix, directory=MANIFEST_DIR):
+    """Manifest of the latest run that produced prefix, or None"""
+    latest = _load(os.path.join(directory, os.path.basename(LATEST_MANIFEST))) or {}
+    run_id = latest.get(prefix)
+    if run_id is None:
+        return None
+    return load_run(run_id, directory)
+
+
+def list_runs(directory=MANIFEST_DIR):
+    """Ids of every run that has a manifest, oldest first"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name[len("run_"):-len(".json")] for name in names if name.startswith("run_") and name.endswith(".json"))
+
+
+def load_run(run_id, directory=MANIFEST_DIR):
+    return _load(manifest_path(run_id, directory))
+
+
+def output_files(manifest, prefix, kind):
+    """Paths of one kind of file a run produced for prefix"""
+    output = (manifest or {}).get("outputs", {}).get(prefix, {})
+    return [f["path"] for f in output.get("files", []) if f["kind"] == kind]
@@ -0,0 +1,14 @@
+from article_store import close_article_store
+from frontier import get_frontier
+from http_client import print_transport_stats
+from pipeline import shutdown_parse_pool
+from seen_index import close_seen_index
+
+
+def finish_run():
+    """Close the run's shared resources and print its crawl and transport summaries"""
+    close_seen_index()
+    close_article_store()
+    shutdown_parse_pool()
+    print(get_frontier().summary())
+    print_transport_stats()
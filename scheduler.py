@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fetch_engine import get_host
+
+# Default politeness policy applied to every host (requests per second,
+# burst size and minimum gap between two requests to the same host)
+DEFAULT_HOST_RATE = float(os.environ.get("SCRAPER_HOST_RATE", "0.5"))
+DEFAULT_HOST_BURST = float(os.environ.get("SCRAPER_HOST_BURST", "2"))
+DEFAULT_HOST_MIN_DELAY = float(os.environ.get("SCRAPER_HOST_MIN_DELAY", "1.0"))
+
+# Per-host overrides, e.g. {"www.cbc.ca": {"rate": 1.0, "burst": 3, "min_delay": 0.5}}
+HOST_POLICIES = {}
+
+# Number of hosts crawled at the same time
+MAX_PARALLEL_HOSTS = int(os.environ.get("SCRAPER_MAX_PARALLEL_HOSTS", "8"))
+
+
+class TokenBucket:
+    """Token bucket with a minimum delay between grants"""
+
+    def __init__(self, rate, burst, min_delay):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(burst, 1.0)
+        self.min_delay = max(min_delay, 0.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.last_grant = None
+        self.not_before = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Reserve the next request slot and return how many seconds to wait for it"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.not_before)
+            if self.last_grant is not None:
+                start = max(start, self.last_grant + self.min_delay)
+
+            # Refill up to the moment the request would start
+            self.tokens = min(self.capacity, self.tokens + (start - self.updated) * self.rate)
+            self.updated = start
+
+            # Not enough tokens yet: push the start back until one has accumulated
+            if self.tokens < 1:
+                start += (1 - self.tokens) / self.rate
+                self.tokens = 1.0
+                self.updated = start
+
+            self.tokens -= 1
+            self.last_grant = start
+            return start - now
+
+    def defer(self, seconds):
+        """Hold back every request for the next `seconds` (e.g. after a Retry-After)"""
+        with self.lock:
+            self.not_before = max(self.not_before, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """Keeps one token bucket per host so politeness is enforced per domain"""
+
+    def __init__(self, policies=None):
+        self.policies = HOST_POLICIES if policies is None else policies
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket_for(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                policy = self.policies.get(host, {})
+                bucket = TokenBucket(
+                    policy.get("rate", DEFAULT_HOST_RATE),
+                    policy.get("burst", DEFAULT_HOST_BURST),
+                    policy.get("min_delay", DEFAULT_HOST_MIN_DELAY),
+                )
+                self._buckets[host] = bucket
+            return bucket
+
+    def wait(self, url):
+        """Block the calling thread until a request to url's host is allowed"""
+        delay = self._bucket_for(get_host(url)).reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def pause(self, url, seconds):
+        """Stop sending requests to url's host for the given number of seconds"""
+        self._bucket_for(get_host(url)).defer(seconds)
+
+
+_limiter = HostRateLimiter()
+
+
+def wait_for_host(url):
+    """Wait for the shared per-host rate limiter before requesting url"""
+    return _limiter.wait(url)
+
+
+def pause_host(url, seconds):
+    """Pause the shared per-host rate limiter for url's host"""
+    _limiter.pause(url, seconds)
+
+
+def group_sites_by_host(sites):
+    """Group site configs by host, keeping each site's position in the list"""
+    groups = OrderedDict()
+    for index, site in enumerate(sites):
+        groups.setdefault(get_host(site['url']), []).append((index, site))
+    return groups
+
+
+def run_sites_by_host(sites, scrape_fn, max_parallel_hosts=MAX_PARALLEL_HOSTS):
+    """Scrape sites with one worker per host and return the results in site order
+
+    Sites that share a host are scraped one after the other by the same
+    worker; different hosts are crawled at the same time.
+    """
+    groups = group_sites_by_host(sites)
+    results = [[] for _ in sites]
+
+    def run_group(group):
+        for index, site in group:
+            try:
+                results[index] = scrape_fn(site)
+            except Exception as e:
+                print(f"Error processing site {site['name']}: {e}")
+
+    if groups:
+        workers = max(1, min(max_parallel_hosts, len(groups)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="host") as pool:
+            list(pool.map(run_group, groups.values()))
+
+    return results
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import news_scraper
+import rc
+from article_stream import STREAM_OUTPUT, ArticleFile, close_article_stream, open_article_stream
+from near_duplicates import NEAR_DUP_ENABLED, collapse_near_duplicate_groups
+from run_manifest import record_run
+from run_teardown import finish_run
+from scheduler import run_sites_by_host
+
+
+def main():
+    """Scrape the Radio-Canada and aggregator site lists in one run sharing a single crawl frontier"""
+    # Radio-Canada sections come first so rc.py keeps ownership of the
+    # articles both lists link to, as when the two scripts ran in sequence
+    sites = rc.RADIO_CANADA_SITES + news_scraper.NEWS_SITES
+    scrapers = {id(site): rc.scrape_radio_canada_site for site in rc.RADIO_CANADA_SITES}
+    scrapers.update({id(site): news_scraper.scrape_website for site in news_scraper.NEWS_SITES})
+
+    # Same timestamp for both outputs so combine_outputs.py pairs them up
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    global_seen_urls = set()
+    rc_stream = news_stream = None
+    if STREAM_OUTPUT:
+        # Articles are appended to one JSONL file per scraper as they are
+        # extracted; both streams share the URL set for de-duplication
+        rc_stream = open_article_stream(rc.OUTPUT_PREFIX, timestamp, global_seen_urls)
+        news_stream = open_article_stream(news_scraper.OUTPUT_PREFIX, timestamp, global_seen_urls)
+
+    # Sections of both lists that share a host are crawled by the same
+    # worker, so each server is still paced by a single rate limiter
+    results = run_sites_by_host(sites, lambda site: scrapers[id(site)](site))
+    rc_results = results[:len(rc.RADIO_CANADA_SITES)]
+    news_results = results[len(rc.RADIO_CANADA_SITES):]
+
+    if STREAM_OUTPUT:
+        close_article_stream(rc.OUTPUT_PREFIX)
+        close_article_stream(news_scraper.OUTPUT_PREFIX)
+        rc_stream.report(rc.RADIO_CANADA_SITES)
+        news_stream.report(news_scraper.NEWS_SITES)
+        rc_articles = ArticleFile(rc_stream.path)
+        news_articles = ArticleFile(news_stream.path)
+    else:
+        rc_articles = rc.collect_unique_articles(rc.RADIO_CANADA_SITES, rc_results, global_seen_urls)
+        news_articles = news_scraper.collect_unique_articles(news_scraper.NEWS_SITES, news_results, global_seen_urls)
+    if NEAR_DUP_ENABLED:
+        # One copy of each story carried by several sections, with the others
+        # as alternates; a single index spans both lists so a story carried
+        # by both is kept once, in the Radio-Canada output
+        rc_articles, news_articles = collapse_near_duplicate_groups([rc_articles, news_articles])
+
+    # Both scrapers' files go into one run manifest for combine_outputs.py
+    record_run(timestamp, rc.OUTPUT_PREFIX, rc.save_articles(rc_articles, timestamp), rc_stream)
+    record_run(timestamp, news_scraper.OUTPUT_PREFIX, news_scraper.save_articles(news_articles, timestamp), news_stream)
+
+    finish_run()
+
+
+if __name__ == "__main__":
+    main()
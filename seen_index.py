@@ -0,0 +1,180 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# Persistent index of every article captured by previous runs
+SEEN_INDEX_PATH = os.environ.get("SCRAPER_SEEN_INDEX", "scraped_data/seen_articles.sqlite3")
+
+# Only fetch articles missing from the index (links already captured are skipped)
+INCREMENTAL_MODE = os.environ.get("SCRAPER_INCREMENTAL", "0") == "1"
+
+# Bloom filter sizing: memory is fixed by the capacity, not by the index size
+BLOOM_CAPACITY = int(os.environ.get("SCRAPER_BLOOM_CAPACITY", "2000000"))
+BLOOM_ERROR_RATE = 0.01
+
+# New rows per commit; the Bloom filter is saved with each commit, so a run
+# that dies loses at most this many articles from the index
+SEEN_COMMIT_EVERY = int(os.environ.get("SCRAPER_SEEN_COMMIT_EVERY", "100"))
+
+
+def content_hash(text):
+    """Stable hash of an article's content"""
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE, bits=None):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        if bits is not None and len(bits) != (self.size + 7) // 8:
+            raise ValueError(f"Bloom filter needs {(self.size + 7) // 8} bytes, got {len(bits)}")
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class SeenIndex:
+    """SQLite index of scraped article URLs with a Bloom filter in front
+
+    Most lookups are for new URLs, which the Bloom filter answers without
+    touching the database. The filter is saved next to the database together
+    with the last rowid it covers, so opening the index only replays rows
+    added since the filter was last saved. Rows are committed, and the
+    filter saved, every commit_every new articles and on close.
+    """
+
+    def __init__(self, path=SEEN_INDEX_PATH, capacity=BLOOM_CAPACITY, incremental=INCREMENTAL_MODE,
+                 commit_every=SEEN_COMMIT_EVERY):
+        self.path = path
+        self.capacity = capacity
+        self.incremental = incremental
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        self.bloom_path = os.path.splitext(path)[0] + ".bloom"
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS seen_articles ("
+            "url TEXT PRIMARY KEY, content_hash TEXT, first_seen TEXT)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS seen_articles_hash ON seen_articles (content_hash)")
+        self.db.commit()
+        self.bloom, self.bloom_rowid = self._load_bloom(capacity)
+        self.skipped = 0
+        self.added = 0
+
+    def _load_bloom(self, capacity):
+        bloom = None
+        rowid = 0
+        try:
+            with open(self.bloom_path, "rb") as f:
+                header = f.readline().decode("ascii").split()
+                saved_capacity, rowid = int(header[0]), int(header[1])
+                if saved_capacity == capacity:
+                    bloom = BloomFilter(capacity, bits=bytearray(f.read()))
+        except (OSError, ValueError, IndexError):
+            # Missing, truncated or for another capacity: rebuilt from every row
+            bloom = None
+        if bloom is None:
+            bloom = BloomFilter(capacity)
+            rowid = 0
+
+        # Replay only the rows added after the saved filter
+        last = rowid
+        for row_id, url in self.db.execute("SELECT rowid, url FROM seen_articles WHERE rowid > ?", (rowid,)):
+            bloom.add(url)
+            last = max(last, row_id)
+        return bloom, last
+
+    def has(self, url):
+        """Return True if url was captured by a previous run"""
+        with self.lock:
+            if url not in self.bloom:
+                return False
+            row = self.db.execute("SELECT 1 FROM seen_articles WHERE url = ?", (url,)).fetchone()
+            return row is not None
+
+    def add(self, url, text=""):
+        """Record url (and a hash of its content) as scraped"""
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO seen_articles (url, content_hash, first_seen) VALUES (?, ?, ?)",
+                (url, content_hash(text), datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+            )
+            if cursor.rowcount:
+                self.bloom.add(url)
+                self.bloom_rowid = max(self.bloom_rowid, cursor.lastrowid)
+                self.added += 1
+                self.uncommitted += 1
+                if self.uncommitted >= self.commit_every:
+                    self._commit()
+
+    def add_article(self, article):
+        self.add(article['url'], article.get('content', ""))
+
+    def should_skip(self, url):
+        """In incremental mode, return True (and count it) for links captured by earlier runs"""
+        if not self.incremental or not self.has(url):
+            return False
+        with self.lock:
+            self.skipped += 1
+        return True
+
+    def _commit(self):
+        # The filter is saved after the rows it covers are committed, so a
+        # crash in between only makes the next run replay a few more rows
+        self.db.commit()
+        tmp_path = self.bloom_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(f"{self.capacity} {self.bloom_rowid}\n".encode("ascii"))
+            f.write(self.bloom.bits)
+        os.replace(tmp_path, self.bloom_path)
+        self.uncommitted = 0
+
+    def close(self):
+        """Commit pending rows and save the Bloom filter for the next run"""
+        with self.lock:
+            self._commit()
+            self.db.close()
+        print(f"Seen-article index: {self.added} new articles recorded, {self.skipped} known links skipped")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_seen_index():
+    """Return the process-wide seen-article index, opening it on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SeenIndex()
+        return _index
+
+
+def close_seen_index():
+    """Flush and close the process-wide index (a later call to get_seen_index reopens it)"""
+    global _index
+    with _index_lock:
+        if _index is not None:
+            _index.close()
+            _index = None
@@ -0,0 +1,300 @@
+"""Benchmark link extraction, article extraction, export and combine on the offline fixture corpus.
+
+Replays the pages recorded by tools/record_fixtures.py through the
+scrapers' own code, without any network access:
+
+- links: news_scraper.find_article_links / rc.extract_article_links on
+  each site's listing page
+- articles: the parse step of both extract_article_content variants
+  (news_scraper.parse_article_page / rc.parse_article_html) on its
+  article pages
+- export: exporter.export_articles (full JSON, CSV, chunks, summary,
+  archive) over every extracted article
+- combine: combine_outputs' de-duplication, external sort and
+  write_combined over the exported records
+
+Each site (and the export/combine step) runs in a fresh process, so the
+peak RSS reported is that site's own. Every stage runs --rounds times
+and is timed by its fastest round, which is far less noisy than the
+total. Results are compared with a stored baseline: a stage whose output
+digest changed makes the command exit with status 1; one that is slower
+or uses more memory than the baseline by more than --tolerance is
+reported as a warning, and only fails the run with --fail-on-slowdown.
+
+Usage:
+    python tools/bench_extraction.py [--fixtures fixtures] [--rounds 5] [--output bench.md]
+    python tools/bench_extraction.py --save-baseline
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURE_DIR = "fixtures"
+BASELINE_NAME = "baseline.json"
+
+# Fixed so that export output (and therefore its digest) is reproducible
+FIXTURE_DATE = "2000-01-01 00:00:00"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (0 where unsupported)"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def _timed(fn, items, rounds):
+    """Run fn over items `rounds` times; return (seconds of the fastest round, outputs of the last round)"""
+    outputs = []
+    best = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds):
+            start = time.perf_counter()
+            outputs = [fn(item) for item in items]
+            best = min(best, time.perf_counter() - start)
+    return best, outputs
+
+
+def _stage(pages, size, seconds, outputs):
+    return {"pages": pages, "bytes": size, "seconds": seconds, "digest": _digest(outputs)}
+
+
+def read_page(fixtures, site_entry, page):
+    from pipeline import decode_body
+
+    with open(os.path.join(fixtures, site_entry["dir"], page["file"]), "rb") as f:
+        body = f.read()
+    return decode_body(body, page.get("encoding")), len(body)
+
+
+def bench_site(fixtures, site_entry, rounds):
+    """Benchmark one site's link and article extraction (runs in its own process)"""
+    from frontier import reset_frontier
+    from html_parsers import parse_html
+    import news_scraper
+    import rc
+
+    sites = news_scraper.NEWS_SITES if site_entry["scraper"] == "news_scraper" else rc.RADIO_CANADA_SITES
+    site = next(s for s in sites if s['name'] == site_entry["site"])
+    listing, listing_size = read_page(fixtures, site_entry, site_entry["listing"])
+    pages = [(page["url"],) + read_page(fixtures, site_entry, page) for page in site_entry["articles"]]
+    article_bytes = sum(size for _, _, size in pages)
+
+    if site_entry["scraper"] == "rc":
+        def links(html):
+            reset_frontier()
+            return [link['url'] for link in rc.extract_article_links(html, site['url'])[:site['max_articles']]]
+
+        def extract(page):
+            title, content, _ = rc.parse_article_html(page[1])
+            return {"title": title, "content": content}
+    else:
+        def links(html):
+            reset_frontier()
+            soup = parse_html(html, site.get('parser'))
+            return [link['url'] for link in news_scraper.find_article_links(soup, site, site['max_articles'])]
+
+        def extract(page):
+            parsed = news_scraper.parse_article_page(page[1], site, page[0])
+            return {"title": parsed['title'], "content": parsed['content']}
+
+    stages = {}
+    seconds, outputs = _timed(links, [listing], rounds)
+    stages["links"] = _stage(1, listing_size, seconds, outputs)
+    seconds, outputs = _timed(extract, pages, rounds)
+    stages["articles"] = _stage(len(pages), article_bytes, seconds, outputs)
+
+    articles = [
+        {"source": site['name'], "title": parsed["title"], "url": url, "content": parsed["content"],
+         "date_scraped": FIXTURE_DATE}
+        for (url, _, _), parsed in zip(pages, outputs) if parsed["title"] and parsed["content"]
+    ]
+    return {"stages": stages, "peak_rss_mb": peak_rss_mb(), "articles": articles}
+
+
+def bench_pipeline(articles_path, rounds):
+    """Benchmark the export and combine steps over the extracted articles (runs in its own process)"""
+    from article_stream import read_articles
+    import combine_outputs
+    import exporter
+
+    size = os.path.getsize(articles_path)
+    articles = list(read_articles(articles_path))
+    stages = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+
+        def export(n):
+            return exporter.export_articles(articles, "bench_articles", f"20000101_0000{n:02d}")
+
+        seconds, outputs = _timed(export, [0], rounds)
+        full = next(f["path"] for f in outputs[0] if f["kind"] == "full")
+        with open(full, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:12]
+        stages["export"] = {"pages": len(articles), "bytes": size, "seconds": seconds, "digest": digest}
+
+        def combine(n):
+            stats = {"duplicates": 0}
+            order = []
+            with tempfile.TemporaryDirectory(dir=tmp) as sort_dir:
+                run_files, count = combine_outputs.spill_sorted_runs(
+                    combine_outputs.unique_records([articles_path], stats), sort_dir)
+
+                def records():
+                    for a in combine_outputs.merged_records(run_files):
+                        order.append(a.get("url"))
+                        yield a
+
+                combine_outputs.write_combined(os.path.join(tmp, f"combined_{n}.txt"), records(), count,
+                                               [articles_path])
+            return order
+
+        seconds, outputs = _timed(combine, [0], rounds)
+        stages["combine"] = _stage(len(articles), size, seconds, outputs[0])
+    return {"stages": stages, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_isolated(fn, *args):
+    """Run fn in a fresh interpreter, so its peak RSS is its own"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def compare(results, baseline, tolerance):
+    """List of (site, stage, problem, timing) where results are worse than the baseline
+
+    timing is True for slowdowns and RSS growth, False for changed output.
+    """
+    problems = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if base.get("peak_rss_mb") and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            problems.append((name, "-", f"peak RSS {result['peak_rss_mb']:.1f} MB vs {base['peak_rss_mb']:.1f} MB", True))
+        for stage, metrics in result["stages"].items():
+            old = base["stages"].get(stage)
+            if old is None:
+                continue
+            rate, old_rate = _rate(metrics), _rate(old)
+            if old_rate and rate < old_rate * (1 - tolerance):
+                problems.append((name, stage, f"{rate:.1f} pages/s vs {old_rate:.1f} pages/s", True))
+            if metrics["digest"] != old["digest"]:
+                problems.append((name, stage, "output differs from baseline", False))
+    return problems
+
+
+def _rate(metrics):
+    return metrics["pages"] / (metrics["seconds"] or 1e-9)
+
+
+def table(results, baseline):
+    lines = [
+        "| Site | Stage | Pages | MB | Pages/s | MB/s | Peak RSS MB | vs baseline |",
+        "|" + " --- |" * 8,
+    ]
+    for name, result in results.items():
+        for stage, metrics in result["stages"].items():
+            seconds = metrics["seconds"] or 1e-9
+            old = baseline.get(name, {}).get("stages", {}).get(stage)
+            change = f"{(_rate(metrics) / _rate(old) - 1) * 100:+.0f}%" if old and _rate(old) else "-"
+            lines.append(
+                f"| {name} | {stage} | {metrics['pages']} | {metrics['bytes'] / 1e6:.2f} | {_rate(metrics):.1f} | "
+                f"{metrics['bytes'] / 1e6 / seconds:.2f} | {result['peak_rss_mb']:.1f} | {change} |"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--rounds", type=int, default=5, help="runs of each stage; the fastest one is reported")
+    parser.add_argument("--sites", help="comma-separated site names (default: every recorded site)")
+    parser.add_argument("--baseline", help=f"baseline results (default: <fixtures>/{BASELINE_NAME})")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="slowdown / RSS growth reported (0.5 = 50%%)")
+    parser.add_argument("--fail-on-slowdown", action="store_true",
+                        help="exit with status 1 on slowdowns too, not only on changed output")
+    parser.add_argument("--output", help="also write the Markdown table to this file")
+    args = parser.parse_args()
+
+    manifest_path = os.path.join(args.fixtures, "manifest.json")
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            site_entries = json.load(f)["sites"]
+    except (OSError, ValueError, KeyError):
+        print(f"No fixture corpus at {manifest_path}; record one with tools/record_fixtures.py first.")
+        return
+    if args.sites:
+        wanted = {name.strip() for name in args.sites.split(",")}
+        site_entries = [entry for entry in site_entries if entry["site"] in wanted]
+
+    baseline_path = args.baseline or os.path.join(args.fixtures, BASELINE_NAME)
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    fixtures = os.path.abspath(args.fixtures)
+    # Keep the benchmark away from the real seen-article index
+    scratch = tempfile.mkdtemp(prefix="bench_extraction_")
+    os.environ["SCRAPER_SEEN_INDEX"] = os.path.join(scratch, "seen_articles.sqlite3")
+
+    results = {}
+    articles_path = os.path.join(scratch, "articles.jsonl")
+    with open(articles_path, "w", encoding="utf-8") as articles_file:
+        for entry in site_entries:
+            result = run_isolated(bench_site, fixtures, entry, args.rounds)
+            for article in result.pop("articles"):
+                articles_file.write(json.dumps(article, ensure_ascii=False) + "\n")
+            results[entry["site"]] = result
+            print(f"Benchmarked {entry['site']}")
+    if os.path.getsize(articles_path):
+        # Only comparable with the baseline when every recorded site took part
+        results["(selected sites)" if args.sites else "(all sites)"] = run_isolated(bench_pipeline, articles_path, args.rounds)
+    shutil.rmtree(scratch, ignore_errors=True)
+
+    output = table(results, baseline)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Wrote {args.output}")
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Saved baseline to {baseline_path}")
+        return
+    problems = compare(results, baseline, args.tolerance)
+    for name, stage, problem, timing in problems:
+        print(f"{'SLOWER' if timing else 'REGRESSION'} {name} [{stage}]: {problem}")
+    if any(not timing or args.fail_on_slowdown for *_, timing in problems):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare parse throughput of the HTML parser backends on pages from the HTTP cache.
+
+Every cached article page is run through news_scraper.parse_article_page
+once per backend with the selectors of the site it belongs to. The result
+is a Markdown table of pages/s and MB/s per site and backend, plus the
+number of pages whose extracted text differs from html.parser.
+
+Usage:
+    python tools/bench_parsers.py [--cache-dir scraped_data/http_cache] [--output bench.md]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetch_engine import get_host  # noqa: E402
+from html_parsers import available_parsers  # noqa: E402
+from http_cache import HTTP_CACHE_DIR, iter_cached_pages  # noqa: E402
+import news_scraper  # noqa: E402
+
+
+def pages_by_site(pages, sites):
+    """Assign each cached article page to the first site config of its host"""
+    site_for_host = {}
+    for site in sites:
+        site_for_host.setdefault(get_host(site['url']), site)
+    grouped = {}
+    listing_urls = {site['url'] for site in sites}
+    for url, body, encoding in pages:
+        site = site_for_host.get(get_host(url))
+        if site is None or url in listing_urls:
+            continue
+        grouped.setdefault(site['name'], (site, []))[1].append(body.decode(encoding or "utf-8", "replace"))
+    return grouped
+
+
+def bench_site(site, pages, parsers, rounds):
+    """Return {parser: (seconds, contents)} for parsing every page `rounds` times"""
+    results = {}
+    for parser in parsers:
+        config = dict(site, parser=parser)
+        contents = []
+        start = time.perf_counter()
+        for _ in range(rounds):
+            contents = [news_scraper.parse_article_page(html, config)["content"] for html in pages]
+        results[parser] = (time.perf_counter() - start, contents)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cache-dir", default=HTTP_CACHE_DIR)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="also write the Markdown table to this file")
+    args = parser.parse_args()
+
+    parsers = list(available_parsers())
+    grouped = pages_by_site(iter_cached_pages(args.cache_dir), news_scraper.NEWS_SITES)
+    if not grouped:
+        print(f"No cached article pages found under {args.cache_dir}; run a scrape first.")
+        return
+
+    header = "| Site | Pages | MB | " + " | ".join(f"{p} pages/s | {p} MB/s" for p in parsers) + " | Text differs |"
+    lines = [header, "|" + " --- |" * (3 + 2 * len(parsers) + 1)]
+    for name, (site, pages) in sorted(grouped.items()):
+        megabytes = sum(len(html.encode("utf-8")) for html in pages) / 1e6
+        results = bench_site(site, pages, parsers, args.rounds)
+        cells = []
+        for p in parsers:
+            seconds = results[p][0] or 1e-9
+            cells.append(f"{len(pages) * args.rounds / seconds:.1f} | {megabytes * args.rounds / seconds:.2f}")
+        baseline = results["html.parser"][1]
+        differs = sum(
+            1 for p in parsers for a, b in zip(results[p][1], baseline) if a != b
+        )
+        lines.append(f"| {name} | {len(pages)} | {megabytes:.2f} | " + " | ".join(cells) + f" | {differs} |")
+
+    table = "\n".join(lines)
+    print(table)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(table + "\n")
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Pack the scraped articles into size-bounded payloads for Claude and zip them.
+
+Reads the run outputs under --input-dir (the full .json export of each
+run, where near-duplicate stories are collapsed, or the streamed .jsonl
+of runs that have no export; summaries, chunks and CSVs are skipped), drops articles already seen in another input file (same
+canonical URL or same content), packs the rest into JSON payloads of at
+most --max-bytes each and writes them plus a zip archive to --output-dir.
+The payloads are compressed in parallel threads before being stored in
+the archive.
+
+Usage:
+    python tools/package_for_claude.py --input-dir scraped_data --output-dir output_for_claude --max-bytes 2000000
+"""
+import argparse
+import glob
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_stream import read_article_file  # noqa: E402
+from exporter import ChunkPacker, MAX_CHUNK_TOKENS, encode_article  # noqa: E402
+from frontier import canonical_key  # noqa: E402
+from seen_index import content_hash  # noqa: E402
+
+PAYLOAD_PREFIX = "claude_payload"
+
+
+def input_files(input_dir):
+    """Article files of every run, newest first, preferring a run's JSON export to its JSONL stream"""
+    files = []
+    for path in glob.glob(os.path.join(input_dir, "*_articles_*.json*")):
+        stem, ext = os.path.splitext(path)
+        if "_summary_" in os.path.basename(path) or ext not in (".json", ".jsonl"):
+            continue
+        if ext == ".jsonl" and os.path.exists(stem + ".json"):
+            continue
+        files.append(path)
+    return sorted(files, key=os.path.getmtime, reverse=True)
+
+
+def unique_articles(paths, stats):
+    """Yield each article once across all input files (first file wins)"""
+    seen_urls = set()
+    seen_content = set()
+    for path in paths:
+        stats["bytes_in"] += os.path.getsize(path)
+        for article in read_article_file(path):
+            stats["articles_in"] += 1
+            url = canonical_key(article.get("url") or "")
+            digest = content_hash(article.get("content"))
+            if url in seen_urls or digest in seen_content:
+                stats["duplicates"] += 1
+                continue
+            seen_urls.add(url)
+            seen_content.add(digest)
+            yield article
+
+
+def _deflate(path, level):
+    with open(path, "rb") as f:
+        data = f.read()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    return zlib.crc32(data), len(data), compressed
+
+
+def _dos_time(timestamp):
+    t = time.localtime(timestamp)
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def write_zip(archive_path, paths, arcdir, workers, level=6):
+    """Write a deflate zip of paths, compressing the members in parallel threads
+
+    zlib releases the GIL while compressing, so the members are deflated
+    concurrently and then written sequentially as raw deflate streams.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        members = list(pool.map(lambda path: _deflate(path, level), paths))
+
+    central = []
+    with open(archive_path, "wb") as out:
+        for path, (crc, size, compressed) in zip(paths, members):
+            if size >= 0xFFFFFFFF or out.tell() >= 0xFFFFFFFF:
+                raise ValueError("Payloads too large for a zip archive without ZIP64")
+            name = f"{arcdir}/{os.path.basename(path)}".encode("utf-8")
+            mod_time, mod_date = _dos_time(os.path.getmtime(path))
+            offset = out.tell()
+            out.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, 20, 0x800, 8, mod_time, mod_date,
+                                  crc, len(compressed), size, len(name), 0))
+            out.write(name)
+            out.write(compressed)
+            central.append(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | 20, 20, 0x800, 8, mod_time, mod_date,
+                                       crc, len(compressed), size, len(name), 0, 0, 0, 0, 0o100644 << 16, offset) + name)
+        directory_offset = out.tell()
+        for entry in central:
+            out.write(entry)
+        directory_size = out.tell() - directory_offset
+        out.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(central), len(central),
+                              directory_size, directory_offset, 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input-dir", default="scraped_data")
+    parser.add_argument("--output-dir", default="output_for_claude")
+    parser.add_argument("--max-bytes", type=int, default=2000000, help="maximum size of one payload file")
+    parser.add_argument("--max-tokens", type=int, default=MAX_CHUNK_TOKENS, help="optional token budget per payload")
+    parser.add_argument("--packing", choices=("sequential", "binpack"), default="binpack")
+    parser.add_argument("--archive", help="zip archive to write (default: <output-dir>.zip)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="compression threads")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    os.makedirs(args.output_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(args.output_dir, f"{PAYLOAD_PREFIX}_chunk_*.json")):
+        os.remove(stale)
+
+    paths = input_files(args.input_dir)
+    if not paths:
+        print(f"No article files found under {args.input_dir}")
+        return
+    stats = {"bytes_in": 0, "articles_in": 0, "duplicates": 0}
+    packer = ChunkPacker(os.path.join(args.output_dir, PAYLOAD_PREFIX), args.max_bytes, args.max_tokens, args.packing)
+    for article in unique_articles(paths, stats):
+        packer.add(article, encode_article(article))
+    total = packer.close()
+    packed = time.perf_counter()
+
+    payloads = [path for path, _ in packer.chunk_files]
+    payload_bytes = sum(os.path.getsize(path) for path in payloads)
+    archive = args.archive or args.output_dir.rstrip("/\\") + ".zip"
+    write_zip(archive, payloads, os.path.basename(args.output_dir.rstrip("/\\")), args.workers)
+    zipped = time.perf_counter()
+
+    print(f"Read {len(paths)} files ({stats['bytes_in'] / 1e6:.2f} MB), {stats['articles_in']} articles, "
+          f"{stats['duplicates']} duplicates dropped")
+    print(f"Wrote {total} payloads ({payload_bytes / 1e6:.2f} MB) to {args.output_dir} in {packed - start:.2f}s")
+    print(f"Wrote {archive} ({os.path.getsize(archive) / 1e6:.2f} MB) with {args.workers} compression threads "
+          f"in {zipped - packed:.2f}s")
+    print(f"Total time: {zipped - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
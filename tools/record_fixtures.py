@@ -0,0 +1,135 @@
+"""Record an offline HTML fixture corpus: a listing page and article pages for every site config.
+
+For each site of news_scraper.NEWS_SITES and rc.RADIO_CANADA_SITES the
+listing page is saved, its article links are found with the scraper's own
+link extraction, and up to --articles of those pages are saved next to it.
+Pages come from the HTTP cache (offline, the default) or, with --live,
+from the sites themselves. fixtures/manifest.json lists every page with
+its URL and encoding; tools/bench_extraction.py replays the corpus.
+
+Usage:
+    python tools/record_fixtures.py [--cache-dir scraped_data/http_cache] [--output fixtures] [--articles 5]
+    python tools/record_fixtures.py --live --sites "CBC Montreal,Radio-Canada Estrie"
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frontier import reset_frontier  # noqa: E402
+from html_parsers import parse_html  # noqa: E402
+from http_cache import HTTP_CACHE_DIR, iter_cached_pages  # noqa: E402
+from pipeline import decode_body  # noqa: E402
+from url_canonical import canonical_url  # noqa: E402
+import news_scraper  # noqa: E402
+import rc  # noqa: E402
+
+FIXTURE_DIR = "fixtures"
+MANIFEST_NAME = "manifest.json"
+
+# (scraper module name, site configs)
+SCRAPERS = (("news_scraper", news_scraper.NEWS_SITES), ("rc", rc.RADIO_CANADA_SITES))
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def listing_links(scraper, site, html):
+    """Article URLs the scraper would follow from a listing page"""
+    # Each site is recorded on its own, so links another site claimed still count
+    reset_frontier()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if scraper == "rc":
+            links = rc.extract_article_links(html, site['url'])[:site['max_articles']]
+        else:
+            links = news_scraper.find_article_links(parse_html(html, site.get('parser')), site, site['max_articles'])
+    return [link['url'] for link in links]
+
+
+class CacheSource:
+    """Pages from the HTTP cache, looked up by canonical URL"""
+
+    def __init__(self, directory):
+        self.pages = {}
+        for url, body, encoding in iter_cached_pages(directory):
+            self.pages[canonical_url(url)] = (body, encoding)
+
+    def get(self, url):
+        return self.pages.get(canonical_url(url))
+
+
+class LiveSource:
+    """Pages fetched from the sites through the shared HTTP layer"""
+
+    def get(self, url):
+        response = rc.fetch_response(url)
+        return (response.content, response.encoding) if response is not None else None
+
+
+def record_site(source, scraper, site, root, articles):
+    """Save one site's listing and article pages under root; return its manifest entry or None"""
+    listing = source.get(site['url'])
+    if listing is None:
+        print(f"{site['name']}: listing page {site['url']} not available")
+        return None
+    relative = os.path.join(scraper, slugify(site['name']))
+    directory = os.path.join(root, relative)
+    os.makedirs(directory, exist_ok=True)
+    entry = {"scraper": scraper, "site": site['name'], "dir": relative, "listing": None, "articles": []}
+
+    def save(name, url, body, encoding):
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(body)
+        return {"file": name, "url": url, "encoding": encoding}
+
+    body, encoding = listing
+    entry["listing"] = save("listing.html", site['url'], body, encoding)
+    for url in listing_links(scraper, site, decode_body(body, encoding)):
+        if len(entry["articles"]) >= articles:
+            break
+        page = source.get(url)
+        if page is not None:
+            entry["articles"].append(save(f"article_{len(entry['articles']) + 1:02d}.html", url, *page))
+    print(f"{site['name']}: listing + {len(entry['articles'])} articles")
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cache-dir", default=HTTP_CACHE_DIR)
+    parser.add_argument("--live", action="store_true", help="fetch the pages instead of reading the HTTP cache")
+    parser.add_argument("--output", default=FIXTURE_DIR)
+    parser.add_argument("--articles", type=int, default=5, help="article pages recorded per site")
+    parser.add_argument("--sites", help="comma-separated site names (default: every site)")
+    args = parser.parse_args()
+
+    wanted = {name.strip() for name in args.sites.split(",")} if args.sites else None
+    source = LiveSource() if args.live else CacheSource(args.cache_dir)
+    entries = []
+    for scraper, sites in SCRAPERS:
+        for site in sites:
+            if wanted and site['name'] not in wanted:
+                continue
+            entry = record_site(source, scraper, site, args.output, args.articles)
+            if entry is not None:
+                entries.append(entry)
+
+    if not entries:
+        print("Nothing recorded" + ("" if args.live else f"; no listing pages in {args.cache_dir} (try --live)"))
+        return
+    os.makedirs(args.output, exist_ok=True)
+    manifest_path = os.path.join(args.output, MANIFEST_NAME)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"sites": entries}, f, ensure_ascii=False, indent=2)
+    pages = sum(1 + len(entry["articles"]) for entry in entries)
+    print(f"Recorded {pages} pages for {len(entries)} sites in {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
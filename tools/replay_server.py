@@ -0,0 +1,241 @@
+"""Local stand-in for the news sites that replays archived pages, with injectable faults.
+
+Pages come from the fixture corpus (tools/record_fixtures.py) and/or the
+HTTP cache, and are served under their original host and path: the
+scrapers send their requests here with SCRAPER_HOST_OVERRIDE and keep the
+real host in the Host header. Responses carry an ETag and honour
+If-None-Match, so the HTTP cache revalidates against the server the way
+it does against the real sites.
+
+Faults, applied per request with the given probabilities:
+    --latency / --jitter   delay before the response (ms)
+    --bandwidth            body throughput cap (KB/s, per response)
+    --error-rate           500/502/503 responses
+    --rate-429             429 responses with a Retry-After of --retry-after seconds
+    --slow-loris           headers sent, then the body one byte every --drip seconds
+                           (read timeouts only end it when --drip exceeds them)
+
+Usage:
+    python tools/replay_server.py --port 8800 --latency 80 --jitter 40 --rate-429 0.02 --error-rate 0.01
+    SCRAPER_HOST_OVERRIDE=http://127.0.0.1:8800 python scrape_all.py
+
+With SCRAPER_HOST_OVERRIDE set the scrapers' HTTP cache is off (unless
+SCRAPER_HTTP_CACHE=1), so every page is requested from this server even
+when it replays that same cache.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_cache import HTTP_CACHE_DIR, iter_cached_pages  # noqa: E402
+from url_canonical import canonical_url  # noqa: E402
+
+FIXTURE_DIR = "fixtures"
+ERROR_STATUSES = (500, 502, 503)
+
+
+class PageStore:
+    """Archived pages keyed by canonical URL"""
+
+    def __init__(self):
+        self.pages = {}
+
+    def add(self, url, body, encoding):
+        content_type = f"text/html; charset={encoding}" if encoding else "text/html"
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self.pages[canonical_url(url)] = (body, content_type, etag)
+
+    def load_fixtures(self, directory):
+        try:
+            with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+                sites = json.load(f)["sites"]
+        except (OSError, ValueError, KeyError):
+            return
+        for site in sites:
+            for page in [site["listing"]] + site["articles"]:
+                with open(os.path.join(directory, site["dir"], page["file"]), "rb") as f:
+                    self.add(page["url"], f.read(), page.get("encoding"))
+
+    def load_cache(self, directory):
+        for url, body, encoding in iter_cached_pages(directory):
+            if self.get(url) is None:
+                self.add(url, body, encoding)
+
+    def get(self, url):
+        return self.pages.get(canonical_url(url))
+
+
+class ReplayStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.statuses = {}
+        self.faults = {}
+        self.bytes = 0
+
+    def record(self, status, fault=None, size=0):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if fault:
+                self.faults[fault] = self.faults.get(fault, 0) + 1
+            self.bytes += size
+
+    def summary(self):
+        with self.lock:
+            statuses = ", ".join(f"{status}: {count}" for status, count in sorted(self.statuses.items()))
+            faults = ", ".join(f"{fault}: {count}" for fault, count in sorted(self.faults.items())) or "none"
+            return (f"Replay server: {sum(self.statuses.values())} requests ({statuses}), "
+                    f"{self.bytes / 1e6:.2f} MB sent, faults injected: {faults}")
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves one request from the page store, injecting the configured faults"""
+
+    protocol_version = "HTTP/1.1"
+    store = None
+    options = None
+    stats = None
+    random = random.Random()
+    random_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        if self.options.verbose:
+            super().log_message(format, *args)
+
+    def _roll(self, probability):
+        with self.random_lock:
+            return probability > 0 and self.random.random() < probability
+
+    def _send_status(self, status, headers=(), fault=None):
+        body = f"{status} {self.responses.get(status, ('',))[0]}\n".encode("ascii")
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+        self.stats.record(status, fault, len(body))
+
+    def _write_body(self, body):
+        bandwidth = self.options.bandwidth * 1024
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        chunk = max(1024, int(bandwidth / 10))
+        for start in range(0, len(body), chunk):
+            self.wfile.write(body[start:start + chunk])
+            self.wfile.flush()
+            time.sleep(min(chunk, len(body) - start) / bandwidth)
+
+    def do_GET(self):
+        options = self.options
+        host = self.headers.get("Host", "")
+        url = f"https://{host}{self.path}"
+
+        if options.latency or options.jitter:
+            with self.random_lock:
+                delay = options.latency + self.random.uniform(0, options.jitter)
+            time.sleep(delay / 1000)
+
+        try:
+            if self._roll(options.rate_429):
+                self._send_status(429, [("Retry-After", str(options.retry_after))], "429")
+                return
+            if self._roll(options.error_rate):
+                with self.random_lock:
+                    status = self.random.choice(ERROR_STATUSES)
+                self._send_status(status, fault="error")
+                return
+
+            page = self.store.get(url)
+            if page is None:
+                self._send_status(404)
+                return
+            body, content_type, etag = page
+            if etag in (self.headers.get("If-None-Match") or ""):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                self.stats.record(304)
+                return
+
+            slow = self._roll(options.slow_loris)
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            if self.command == "HEAD":
+                self.stats.record(200)
+                return
+            if slow:
+                # Trickle the body until the client gives up (read timeout)
+                self.stats.record(200, "slow-loris")
+                for i in range(len(body)):
+                    self.wfile.write(body[i:i + 1])
+                    self.wfile.flush()
+                    time.sleep(options.drip)
+                return
+            self._write_body(body)
+            self.stats.record(200, size=len(body))
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    do_HEAD = do_GET
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="fixture corpus to serve")
+    parser.add_argument("--cache-dir", default=HTTP_CACHE_DIR, help="HTTP cache to serve (fixtures win)")
+    parser.add_argument("--latency", type=float, default=0, help="delay before each response (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="extra random delay of up to this many ms")
+    parser.add_argument("--bandwidth", type=float, default=0, help="KB/s per response (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of 500/502/503 responses")
+    parser.add_argument("--rate-429", type=float, default=0, help="share of 429 responses")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of the 429 responses (s)")
+    parser.add_argument("--slow-loris", type=float, default=0, help="share of responses whose body is trickled")
+    parser.add_argument("--drip", type=float, default=1.0, help="seconds between bytes of a slow-loris body")
+    parser.add_argument("--seed", type=int, help="seed the fault injection for reproducible runs")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    store = PageStore()
+    store.load_fixtures(args.fixtures)
+    store.load_cache(args.cache_dir)
+    if not store.pages:
+        print(f"No pages found in {args.fixtures} or {args.cache_dir}")
+        return
+
+    ReplayHandler.store = store
+    ReplayHandler.options = args
+    ReplayHandler.stats = ReplayStats()
+    ReplayHandler.random = random.Random(args.seed)
+
+    server = ThreadingHTTPServer((args.bind, args.port), ReplayHandler)
+    server.daemon_threads = True
+    print(f"Replaying {len(store.pages)} pages on http://{args.bind}:{server.server_port}")
+    print(f"Point the scrapers at it with SCRAPER_HOST_OVERRIDE=http://{args.bind}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(ReplayHandler.stats.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query parameters that only record where a click came from
+TRACKING_PARAMS = {
+    "cmp", "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "referrer", "xtor", "ocid", "at_medium", "at_campaign",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+# Per-site rules, matched on the link's host or any parent domain:
+# drop_query removes the whole query string (the site's article pages are
+# addressed by path alone); trailing_slash is "strip" or "add", whichever
+# spelling the site's own canonical links use
+SITE_RULES = {
+    "cbc.ca": {"drop_query": True, "trailing_slash": "strip"},
+    "radio-canada.ca": {"drop_query": True, "trailing_slash": "strip"},
+    "lapresse.ca": {"drop_query": True, "trailing_slash": "strip"},
+    "theguardian.com": {"drop_query": True, "trailing_slash": "strip"},
+    "montrealgazette.com": {"drop_query": True, "trailing_slash": "add"},
+    "theconcordian.com": {"drop_query": True, "trailing_slash": "add"},
+}
+DEFAULT_RULE = {"drop_query": False, "trailing_slash": "strip"}
+
+_SLASHES_RE = re.compile(r"/{2,}")
+
+
+def site_rule(host):
+    """Canonicalization rule for a host (the most specific matching domain wins)"""
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        rule = SITE_RULES.get(".".join(labels[i:]))
+        if rule is not None:
+            return rule
+    return DEFAULT_RULE
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url, base_url=None):
+    """Single spelling of an article URL, so variants of one link are fetched once
+
+    Relative links are resolved against base_url. The scheme becomes https
+    (every configured site serves it), the host is lower-cased and loses a
+    default port, repeated slashes and the fragment are dropped, tracking
+    parameters are removed and the rest sorted, and the site's rule
+    decides the query string and trailing slash. Anything that is not an
+    http(s) URL is returned unchanged.
+    """
+    url = url.strip()
+    if base_url:
+        url = urljoin(base_url, url)
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return url
+    host = parts.hostname.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, 80, 443) else f"{host}:{port}"
+
+    rule = site_rule(host)
+    path = _SLASHES_RE.sub("/", parts.path) or "/"
+    if path != "/":
+        if rule["trailing_slash"] == "strip":
+            path = path.rstrip("/") or "/"
+        elif not path.endswith("/") and "." not in path.rsplit("/", 1)[-1]:
+            path += "/"
+
+    if rule["drop_query"]:
+        query = ""
+    else:
+        params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+        query = urlencode(sorted(params))
+    return urlunsplit(("https", netloc, path, query, ""))
+
+
+def same_site(url, other):
+    """True when two URLs are on the same host, ignoring a leading www."""
+    hosts = [(urlsplit(u).hostname or "").lower() for u in (url, other)]
+    return hosts[0].removeprefix("www.") == hosts[1].removeprefix("www.")